@@ -6,17 +6,38 @@ import hashlib
 import smtplib
 import time
 import random
+import secrets
+import threading
+import http.client
+import re
+import gzip
+import zlib
+import shutil
+import zipfile
+import stat
+import sys
+import argparse
+import bisect
+import logging
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, Future
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs, urlencode
+from email.parser import BytesParser
+from email import policy
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
 from email.mime.base import MIMEBase
 from email import encoders
 from datetime import datetime
 from pathlib import Path
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple, Iterator
 import base64
 import io
 import csv
+import hmac
 from dotenv import load_dotenv
+from streamlit import runtime as st_runtime
 
 # Carregar variáveis de ambiente do arquivo .env
 load_dotenv()
@@ -30,27 +51,112 @@ ALLOWED_EXTENSIONS = {
     'py', 'mp3', 'mp4', 'jpg', 'jpeg', 'png', 'zip', 'rar'
 }
 MAX_FILE_SIZE = 25 * 1024 * 1024  # 25MB
+TEXT_EXTENSIONS = {'txt', 'json', 'yaml', 'csv', 'py'}  # sem assinatura; rejeita conteúdo binário
+
+# Compressão em disco de uploads textuais; o arquivo comprimido ganha o sufixo .gz
+# (DOCX já é um ZIP comprimido e nunca alcança a economia mínima)
+COMPRESSIBLE_EXTENSIONS = TEXT_EXTENSIONS
+COMPRESSED_SUFFIX = ".gz"
+COMPRESSION_MIN_SAVING = 0.10  # só comprime se economizar pelo menos 10%
+COMPRESSION_SAMPLE_SIZE = 64 * 1024  # amostra testada antes de comprimir o arquivo inteiro
+
+# Assinaturas (magic bytes) esperadas por extensão: (deslocamento, prefixo)
+FILE_SIGNATURES = {
+    'pdf': [(0, b'%PDF-')],
+    'png': [(0, b'\x89PNG\r\n\x1a\n')],
+    'jpg': [(0, b'\xff\xd8\xff')],
+    'jpeg': [(0, b'\xff\xd8\xff')],
+    'zip': [(0, b'PK\x03\x04'), (0, b'PK\x05\x06')],
+    'docx': [(0, b'PK\x03\x04')],
+    'rar': [(0, b'Rar!\x1a\x07')],
+    'mp3': [(0, b'ID3'), (0, b'\xff\xfb'), (0, b'\xff\xfa'), (0, b'\xff\xf3'),
+            (0, b'\xff\xf2'), (0, b'\xff\xe3'), (0, b'\xff\xe2')],
+    'mp4': [(4, b'ftyp')],
+}
+SIGNATURE_SNIFF_SIZE = 8192
+UPLOAD_WORKERS = 4  # arquivos de uma submissão gravados em paralelo
 DB_PATH = "ribeiro_forms.db"
 UPLOAD_DIR = "uploads"
 LOGO_DIR = "logos"
 
+# Múltiplos formulários (?form=<id>); formulários de alto volume podem ter banco próprio
+DEFAULT_FORM_ID = "default"
+FORM_DB_DIR = "forms"
+FORM_ID_PATTERN = re.compile(r'^[a-z0-9][a-z0-9_-]{0,63}$')
+
+# API HTTP sem navegador (python app.py api)
+API_HOST = os.getenv('API_HOST', '127.0.0.1')
+API_PORT = int(os.getenv('API_PORT', '8502'))
+API_TOKEN = os.getenv('API_TOKEN')
+API_CORS_ORIGIN = os.getenv('API_CORS_ORIGIN')
+API_MAX_BODY_SIZE = 10 * MAX_FILE_SIZE
+API_NOTIFY_WORKERS = 4  # envios de email simultâneos; a fila pendente fica no banco
+API_NOTIFY_LEASE = 600  # segundos até um envio em andamento poder ser retomado
+API_NOTIFY_MAX_ATTEMPTS = 5
+API_NOTIFY_POLL_INTERVAL = 1.0
+API_NOTIFY_MAX_BACKOFF = 3600
+
+# Downloads de anexos via API (links assinados gerados no painel admin)
+API_PUBLIC_URL = os.getenv('API_PUBLIC_URL', '').rstrip('/')
+DOWNLOAD_LINK_TTL = 3600  # segundos
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+ZIP_STORED_EXTENSIONS = {'zip', 'rar', 'jpg', 'jpeg', 'png', 'mp3', 'mp4', 'docx'}
+
+# Importação em lote (python app.py import)
+IMPORT_BATCH_SIZE = 10000
+RESPONSES_CREATED_AT_INDEX = "idx_responses_form_created_at"
+
+# Cotas de uploads (0 = sem limite) e coleta de lixo (python app.py gc)
+UPLOAD_QUOTA_TOTAL = int(os.getenv('UPLOAD_QUOTA_TOTAL_MB', '0')) * 1024 * 1024
+UPLOAD_QUOTA_PER_RESPONSE = int(os.getenv('UPLOAD_QUOTA_PER_RESPONSE_MB', '0')) * 1024 * 1024
+GC_BATCH_SIZE = 2000
+GC_MIN_AGE = 3600  # segundos; protege arquivos de submissões em andamento
+
+# Formato de armazenamento de responses.data: 'json' (texto) ou 'compact'
+# (chaves numeradas + zlib); leitura transparente dos dois (python app.py migrate-responses)
+RESPONSE_DATA_FORMAT = os.getenv('RESPONSE_DATA_FORMAT', 'json')
+RESPONSE_DATA_MAGIC = b'\x00RF'  # JSON em texto nunca começa com byte nulo
+RESPONSE_DATA_VERSION = 1
+RESPONSE_COMPRESS_MIN = 200  # bytes; payloads menores ficam sem zlib
+RESPONSE_ZDICT_SIZE = 32 * 1024  # janela do zlib
+RESPONSE_ZDICT_SAMPLE = 2000  # respostas usadas para treinar o dicionário
+RESPONSE_ZDICT_REFRESH = 300  # segundos até procurar um dicionário mais novo (treinado por outro processo)
+
+# Backups online (python app.py backup / restore)
+# -1 copia tudo num passo só, sob um único snapshot de leitura (em WAL não bloqueia as escritas).
+# Passos pequenos são opcionais: qualquer escrita de outra conexão reinicia a cópia do zero
+BACKUP_PAGES_PER_STEP = -1
+BACKUP_STEP_SLEEP = 0.0
+
+# Notificações em resumo (digest): um email a cada N minutos ou M respostas
+DIGEST_DEFAULT_MINUTES = 60
+DIGEST_DEFAULT_COUNT = 100
+DIGEST_CHECK_INTERVAL = 60  # segundos entre verificações do worker
+DIGEST_MAX_MESSAGE_SIZE = 24 * 1024 * 1024  # email já codificado; o Gmail recusa acima de 25MB
+DIGEST_LINK_TTL = 7 * 24 * 3600
+
+# Webhooks: entrega em segundo plano com pool de threads, retry e lotes
+WEBHOOK_WORKERS = 4  # lotes em andamento ao mesmo tempo (no máximo um por webhook)
+WEBHOOK_BATCH_SIZE = 50  # respostas por requisição quando há fila acumulada
+WEBHOOK_POLL_INTERVAL = 1.0
+WEBHOOK_TIMEOUT = 10
+WEBHOOK_LEASE = 120  # segundos até uma entrega em andamento poder ser retomada
+WEBHOOK_MAX_ATTEMPTS = 8
+WEBHOOK_MAX_BACKOFF = 3600
+
+logger = logging.getLogger("ribeiro_forms")
+
 # Criar diretórios necessários
 Path(UPLOAD_DIR).mkdir(exist_ok=True)
 Path(LOGO_DIR).mkdir(exist_ok=True)
+Path(FORM_DB_DIR).mkdir(exist_ok=True)
 
 # ============================================================================
 # BANCO DE DADOS
 # ============================================================================
 
-def init_db():
-    """Inicializa o banco de dados SQLite"""
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    
-    # Tabela de configurações
-    c.execute('''CREATE TABLE IF NOT EXISTS config
-                 (key TEXT PRIMARY KEY, value TEXT)''')
-    
+def _create_form_tables(c):
+    """Cria as tabelas de um formulário (no banco principal ou em um shard)"""
     # Tabela de campos personalizados
     c.execute('''CREATE TABLE IF NOT EXISTS fields
                  (id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -60,17 +166,90 @@ def init_db():
                   required INTEGER DEFAULT 0,
                   options TEXT,
                   position INTEGER,
-                  is_default INTEGER DEFAULT 0)''')
+                  is_default INTEGER DEFAULT 0,
+                  form_id TEXT NOT NULL DEFAULT 'default')''')
     
     # Tabela de respostas
     c.execute('''CREATE TABLE IF NOT EXISTS responses
                  (id INTEGER PRIMARY KEY AUTOINCREMENT,
                   data TEXT NOT NULL,
                   files TEXT,
+                  created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                  form_id TEXT NOT NULL DEFAULT 'default',
+                  file_hashes TEXT,
+                  imported INTEGER NOT NULL DEFAULT 0)''')
+    
+    # Configurações por formulário (título, descrição, logo)
+    c.execute('''CREATE TABLE IF NOT EXISTS form_config
+                 (form_id TEXT NOT NULL,
+                  key TEXT NOT NULL,
+                  value TEXT,
+                  PRIMARY KEY (form_id, key))''')
+    
+    # Bancos anteriores ao suporte a múltiplos formulários
+    for table in ('fields', 'responses'):
+        columns = [row[1] for row in c.execute(f"PRAGMA table_info({table})")]
+        if 'form_id' not in columns:
+            c.execute(f"ALTER TABLE {table} ADD COLUMN form_id TEXT NOT NULL DEFAULT 'default'")
+    response_columns = [row[1] for row in c.execute("PRAGMA table_info(responses)")]
+    if 'file_hashes' not in response_columns:
+        c.execute("ALTER TABLE responses ADD COLUMN file_hashes TEXT")
+    if 'imported' not in response_columns:
+        c.execute("ALTER TABLE responses ADD COLUMN imported INTEGER NOT NULL DEFAULT 0")
+    
+    # Webhooks e fila de entregas pendentes
+    c.execute('''CREATE TABLE IF NOT EXISTS webhooks
+                 (id INTEGER PRIMARY KEY AUTOINCREMENT,
+                  form_id TEXT NOT NULL,
+                  url TEXT NOT NULL,
+                  secret TEXT NOT NULL,
+                  fields TEXT,
+                  active INTEGER DEFAULT 1,
+                  created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)''')
+    c.execute('''CREATE TABLE IF NOT EXISTS webhook_outbox
+                 (id INTEGER PRIMARY KEY AUTOINCREMENT,
+                  form_id TEXT NOT NULL,
+                  webhook_id INTEGER NOT NULL,
+                  response_id INTEGER NOT NULL,
+                  status TEXT NOT NULL DEFAULT 'pending',
+                  attempts INTEGER DEFAULT 0,
+                  next_attempt_at REAL NOT NULL,
+                  claimed_by TEXT,
+                  last_error TEXT)''')
+    c.execute("CREATE INDEX IF NOT EXISTS idx_webhook_outbox_due ON webhook_outbox(status, next_attempt_at)")
+    
+    # Notificações de respostas recebidas pela API, enviadas em segundo plano
+    c.execute('''CREATE TABLE IF NOT EXISTS notification_outbox
+                 (id INTEGER PRIMARY KEY AUTOINCREMENT,
+                  form_id TEXT NOT NULL,
+                  response_id INTEGER NOT NULL,
+                  status TEXT NOT NULL DEFAULT 'pending',
+                  attempts INTEGER DEFAULT 0,
+                  next_attempt_at REAL NOT NULL,
+                  claimed_by TEXT,
+                  last_error TEXT)''')
+    c.execute("CREATE INDEX IF NOT EXISTS idx_notification_outbox_due ON notification_outbox(status, next_attempt_at)")
+    
+    # Formato compacto: numeração estável das chaves e dicionários zlib treinados.
+    # Nenhum dos dois é apagado, pois respostas antigas dependem deles para serem lidas
+    c.execute('''CREATE TABLE IF NOT EXISTS response_keys
+                 (id INTEGER PRIMARY KEY AUTOINCREMENT,
+                  form_id TEXT NOT NULL,
+                  name TEXT NOT NULL,
+                  UNIQUE (form_id, name))''')
+    c.execute('''CREATE TABLE IF NOT EXISTS response_dicts
+                 (id INTEGER PRIMARY KEY AUTOINCREMENT,
+                  form_id TEXT NOT NULL,
+                  data BLOB NOT NULL,
                   created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)''')
     
-    # Inicializar campos padrão se não existirem
-    c.execute("SELECT COUNT(*) FROM fields")
+    c.execute("DROP INDEX IF EXISTS idx_responses_created_at")
+    c.execute(f"CREATE INDEX IF NOT EXISTS {RESPONSES_CREATED_AT_INDEX} ON responses(form_id, created_at)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_fields_form ON fields(form_id, position)")
+
+def _seed_form(c, form_id: str, title: str):
+    """Insere campos padrão e configurações iniciais de um formulário"""
+    c.execute("SELECT COUNT(*) FROM fields WHERE form_id=?", (form_id,))
     if c.fetchone()[0] == 0:
         default_fields = [
             ('nome', 'Nome', 'text', 1, None, 1, 1),
@@ -81,29 +260,352 @@ def init_db():
             ('anexos', 'Upload de Anexos', 'file', 0, None, 6, 1)
         ]
         c.executemany('''INSERT INTO fields 
-                        (name, label, field_type, required, options, position, is_default)
-                        VALUES (?, ?, ?, ?, ?, ?, ?)''', default_fields)
+                        (name, label, field_type, required, options, position, is_default, form_id)
+                        VALUES (?, ?, ?, ?, ?, ?, ?, ?)''',
+                      [f + (form_id,) for f in default_fields])
+    
+    c.execute("INSERT OR IGNORE INTO form_config VALUES (?, 'title', ?)", (form_id, title))
+    c.execute("INSERT OR IGNORE INTO form_config VALUES (?, 'description', 'Preencha o formulário abaixo')",
+              (form_id,))
+
+def init_db():
+    """Inicializa o banco de dados SQLite"""
+    conn = sqlite3.connect(DB_PATH)
+    c = conn.cursor()
+    
+    # WAL permite leituras do Streamlit em paralelo às escritas da API
+    c.execute("PRAGMA journal_mode=WAL")
+    
+    # Tabela de configurações globais
+    c.execute('''CREATE TABLE IF NOT EXISTS config
+                 (key TEXT PRIMARY KEY, value TEXT)''')
+    
+    # Registro de formulários; db_path NULL = banco principal
+    c.execute('''CREATE TABLE IF NOT EXISTS forms
+                 (id TEXT PRIMARY KEY,
+                  name TEXT NOT NULL,
+                  db_path TEXT,
+                  created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)''')
+    c.execute("INSERT OR IGNORE INTO forms (id, name) VALUES (?, 'Formulário principal')",
+              (DEFAULT_FORM_ID,))
+    
+    _create_form_tables(c)
+    
+    # Título/descrição/logo antigos ficavam na tabela config
+    c.execute('''INSERT OR IGNORE INTO form_config (form_id, key, value)
+                 SELECT ?, key, value FROM config
+                 WHERE key IN ('title', 'description', 'logo_path')''', (DEFAULT_FORM_ID,))
+    _seed_form(c, DEFAULT_FORM_ID, '📝 Ribeiro Forms')
     
     # Configurações iniciais
-    c.execute("SELECT value FROM config WHERE key='title'")
+    c.execute("SELECT value FROM config WHERE key='admin_password'")
     if not c.fetchone():
-        c.execute("INSERT INTO config VALUES ('title', '📝 Ribeiro Forms')")
-        c.execute("INSERT INTO config VALUES ('description', 'Preencha o formulário abaixo')")
-        
         # Hash da senha padrão
         default_password = os.getenv('ADMIN_PASSWORD', 'admin123')
         hashed = hashlib.sha256(default_password.encode()).hexdigest()
         c.execute("INSERT INTO config VALUES ('admin_password', ?)", (hashed,))
     
+    conn.commit()
+    c.execute("SELECT id, db_path FROM forms WHERE db_path IS NOT NULL")
+    shards = c.fetchall()
+    conn.close()
+    
+    # Bancos próprios recebem as mesmas migrações de esquema do banco principal
+    for form_id, db_path in shards:
+        if not os.path.exists(db_path):
+            logger.warning("Banco do formulário %s não encontrado: %s", form_id, db_path)
+            continue
+        conn = sqlite3.connect(db_path)
+        c = conn.cursor()
+        c.execute("PRAGMA journal_mode=WAL")
+        _create_form_tables(c)
+        conn.commit()
+        conn.close()
+
+# ============================================================================
+# FORMULÁRIOS (MÚLTIPLOS FORMULÁRIOS E SHARDS)
+# ============================================================================
+
+# Cache id -> arquivo do banco; o arquivo de um formulário nunca muda após criado
+_form_db_paths: Dict[str, str] = {}
+
+def get_forms() -> List[Dict]:
+    """Retorna todos os formulários cadastrados"""
+    conn = sqlite3.connect(DB_PATH)
+    c = conn.cursor()
+    c.execute("SELECT id, name, db_path, created_at FROM forms ORDER BY id != ?, created_at, id",
+              (DEFAULT_FORM_ID,))
+    forms = [{'id': row[0], 'name': row[1], 'db_path': row[2], 'created_at': row[3]}
+             for row in c.fetchall()]
+    conn.close()
+    return forms
+
+def get_form_db_path(form_id: str) -> str:
+    """Retorna o arquivo SQLite onde ficam os dados do formulário"""
+    if form_id not in _form_db_paths:
+        conn = sqlite3.connect(DB_PATH)
+        c = conn.cursor()
+        c.execute("SELECT db_path FROM forms WHERE id=?", (form_id,))
+        row = c.fetchone()
+        conn.close()
+        if not row:
+            raise ValueError(f"Formulário não encontrado: {form_id}")
+        _form_db_paths[form_id] = row[0] or DB_PATH
+    return _form_db_paths[form_id]
+
+def connect_form_db(form_id: str) -> sqlite3.Connection:
+    """Abre conexão com o banco do formulário"""
+    return sqlite3.connect(get_form_db_path(form_id))
+
+def form_exists(form_id: str) -> bool:
+    """Verifica se o formulário existe"""
+    try:
+        get_form_db_path(form_id)
+        return True
+    except ValueError:
+        return False
+
+def create_form(form_id: str, name: str, dedicated_db: bool = False):
+    """Cria formulário, opcionalmente em um arquivo SQLite próprio"""
+    if not FORM_ID_PATTERN.match(form_id):
+        raise ValueError("Identificador inválido: use letras minúsculas, números, '-' e '_'")
+    if form_exists(form_id):
+        raise ValueError(f"Já existe um formulário com o identificador '{form_id}'")
+    
+    db_path = os.path.join(FORM_DB_DIR, f"{form_id}.db") if dedicated_db else None
+    
+    # Criar as tabelas antes de registrar, para o formulário nunca aparecer incompleto
+    conn = sqlite3.connect(db_path or DB_PATH)
+    c = conn.cursor()
+    if db_path:
+        c.execute("PRAGMA journal_mode=WAL")
+    _create_form_tables(c)
+    _seed_form(c, form_id, name)
     conn.commit()
     conn.close()
+    
+    conn = sqlite3.connect(DB_PATH)
+    c = conn.cursor()
+    c.execute("INSERT INTO forms (id, name, db_path) VALUES (?, ?, ?)", (form_id, name, db_path))
+    conn.commit()
+    conn.close()
+
+def get_form_upload_dir(form_id: str) -> str:
+    """Diretório de uploads do formulário"""
+    if form_id == DEFAULT_FORM_ID:
+        return UPLOAD_DIR
+    upload_dir = os.path.join(UPLOAD_DIR, form_id)
+    Path(upload_dir).mkdir(exist_ok=True)
+    return upload_dir
+
+# ============================================================================
+# FORMATO COMPACTO DAS RESPOSTAS
+# ============================================================================
+#
+# Cabeçalho: MAGIC (3 bytes) + versão (1) + codec (1) [+ id do dicionário (4) se codec=2]
+# Conteúdo: JSON [id_chave, valor, id_chave, valor, ...], cru (0), zlib (1) ou zlib com dicionário (2)
+
+# Caches por formulário; ids de chaves e dicionários nunca mudam depois de gravados
+_response_keys: Dict[str, Dict[str, Dict]] = {}
+_response_zdicts: Dict[str, Dict[int, bytes]] = {}
+# Dicionário usado na gravação: (id, verificado em); id 0 = nenhum treinado
+_response_latest_zdict: Dict[str, Tuple[int, float]] = {}
+
+def _load_response_keys(form_id: str) -> Dict[str, Dict]:
+    """Recarrega do banco a numeração das chaves do formulário"""
+    conn = connect_form_db(form_id)
+    c = conn.cursor()
+    c.execute("SELECT id, name FROM response_keys WHERE form_id=?", (form_id,))
+    rows = c.fetchall()
+    conn.close()
+    cache = {'names': {row[0]: row[1] for row in rows}, 'ids': {row[1]: row[0] for row in rows}}
+    _response_keys[form_id] = cache
+    return cache
+
+def ensure_response_keys(form_id: str, names) -> Dict[str, int]:
+    """Garante um id para cada nome de campo; grava e confirma antes de qualquer uso.
+
+    Deve ser chamada fora de uma transação de escrita aberta no mesmo banco."""
+    cache = _response_keys.get(form_id) or _load_response_keys(form_id)
+    missing = [name for name in names if name not in cache['ids']]
+    if missing:
+        conn = connect_form_db(form_id)
+        conn.executemany("INSERT OR IGNORE INTO response_keys (form_id, name) VALUES (?, ?)",
+                         [(form_id, name) for name in missing])
+        conn.commit()
+        conn.close()
+        cache = _load_response_keys(form_id)
+    return cache['ids']
+
+def _get_response_zdict(form_id: str, dict_id: Optional[int] = None) -> Tuple[int, Optional[bytes]]:
+    """Dicionário zlib pelo id, ou o mais recente do formulário quando dict_id é None"""
+    cache = _response_zdicts.setdefault(form_id, {})
+    if dict_id is not None and dict_id in cache:
+        return dict_id, cache[dict_id]
+    if dict_id is None:
+        # Inclusive a ausência de dicionário fica em cache: gravar não deve custar uma consulta extra
+        latest, checked_at = _response_latest_zdict.get(form_id, (0, 0.0))
+        if time.time() - checked_at < RESPONSE_ZDICT_REFRESH:
+            return latest, cache.get(latest)
+    
+    conn = connect_form_db(form_id)
+    c = conn.cursor()
+    if dict_id is None:
+        c.execute("SELECT id, data FROM response_dicts WHERE form_id=? ORDER BY id DESC LIMIT 1", (form_id,))
+    else:
+        c.execute("SELECT id, data FROM response_dicts WHERE form_id=? AND id=?", (form_id, dict_id))
+    row = c.fetchone()
+    conn.close()
+    if dict_id is None:
+        _response_latest_zdict[form_id] = (row[0] if row else 0, time.time())
+    if not row:
+        if dict_id is not None:
+            raise ValueError(f"Dicionário de respostas {dict_id} não encontrado")
+        return 0, None
+    cache[row[0]] = bytes(row[1])
+    return row[0], cache[row[0]]
+
+def encode_response_data(data: Dict, form_id: str = DEFAULT_FORM_ID,
+                         fmt: Optional[str] = None):
+    """Serializa os dados de uma resposta no formato configurado (str JSON ou bytes compactos)"""
+    if (fmt or RESPONSE_DATA_FORMAT) != 'compact':
+        return json.dumps(data)
+    
+    key_ids = _response_keys.get(form_id, {}).get('ids', {})
+    if any(name not in key_ids for name in data):
+        key_ids = ensure_response_keys(form_id, data.keys())
+    flat = []
+    for name, value in data.items():
+        flat += [key_ids[name], value]
+    payload = json.dumps(flat, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    
+    header = RESPONSE_DATA_MAGIC + bytes([RESPONSE_DATA_VERSION, 0])
+    if len(payload) >= RESPONSE_COMPRESS_MIN:
+        dict_id, zdict = _get_response_zdict(form_id)
+        compressor = zlib.compressobj(9, zdict=zdict) if zdict else zlib.compressobj(9)
+        compressed = compressor.compress(payload) + compressor.flush()
+        if len(compressed) < len(payload):
+            if zdict:
+                header = RESPONSE_DATA_MAGIC + bytes([RESPONSE_DATA_VERSION, 2]) + dict_id.to_bytes(4, 'big')
+            else:
+                header = RESPONSE_DATA_MAGIC + bytes([RESPONSE_DATA_VERSION, 1])
+            payload = compressed
+    return header + payload
+
+def decode_response_data(raw, form_id: str = DEFAULT_FORM_ID) -> Dict:
+    """Lê responses.data em qualquer formato (JSON em texto ou compacto)"""
+    if isinstance(raw, str):
+        return json.loads(raw)
+    raw = bytes(raw)
+    if not raw.startswith(RESPONSE_DATA_MAGIC):
+        return json.loads(raw)
+    
+    version, codec = raw[3], raw[4]
+    if version != RESPONSE_DATA_VERSION:
+        raise ValueError(f"Versão de formato de resposta desconhecida: {version}")
+    payload = raw[5:]
+    if codec == 1:
+        payload = zlib.decompress(payload)
+    elif codec == 2:
+        _, zdict = _get_response_zdict(form_id, int.from_bytes(payload[:4], 'big'))
+        decompressor = zlib.decompressobj(zdict=zdict)
+        payload = decompressor.decompress(payload[4:]) + decompressor.flush()
+    elif codec != 0:
+        raise ValueError(f"Codec de resposta desconhecido: {codec}")
+    
+    flat = json.loads(payload)
+    names = _response_keys.get(form_id, {}).get('names', {})
+    if any(key_id not in names for key_id in flat[0::2]):
+        names = _load_response_keys(form_id)['names']
+    return {names[key_id]: value for key_id, value in zip(flat[0::2], flat[1::2])}
+
+def train_response_dict(form_id: str = DEFAULT_FORM_ID, sample: int = RESPONSE_ZDICT_SAMPLE) -> Optional[int]:
+    """Treina um dicionário zlib com as respostas recentes; retorna o id ou None sem amostras"""
+    conn = connect_form_db(form_id)
+    c = conn.cursor()
+    c.execute("SELECT data FROM responses WHERE form_id=? ORDER BY id DESC LIMIT ?", (form_id, sample))
+    rows = c.fetchall()
+    conn.close()
+    
+    # Fragmentos frequentes: valores curtos inteiros (opções, cidades) e palavras de textos longos
+    counts = Counter()
+    for row in rows:
+        for value in decode_response_data(row[0], form_id).values():
+            for item in (value if isinstance(value, list) else [value]):
+                text = json.dumps(item, ensure_ascii=False)
+                if len(text) <= 64:
+                    counts[text] += 1
+                else:
+                    counts.update(re.findall(r'\w{4,}\W', text))
+    
+    fragments = [f for f, n in counts.items() if n > 1]
+    if not fragments:
+        return None
+    # O zlib alcança melhor o fim do dicionário: os fragmentos mais rentáveis vão por último
+    fragments.sort(key=lambda f: counts[f] * len(f), reverse=True)
+    zdict = b''
+    for fragment in fragments:
+        encoded = fragment.encode('utf-8')
+        if len(zdict) + len(encoded) > RESPONSE_ZDICT_SIZE:
+            break
+        zdict = encoded + zdict
+    
+    conn = connect_form_db(form_id)
+    c = conn.cursor()
+    c.execute("INSERT INTO response_dicts (form_id, data) VALUES (?, ?)", (form_id, zdict))
+    conn.commit()
+    dict_id = c.lastrowid
+    conn.close()
+    _response_zdicts.setdefault(form_id, {})[dict_id] = zdict
+    _response_latest_zdict[form_id] = (dict_id, time.time())
+    return dict_id
+
+def migrate_response_data(form_id: str = DEFAULT_FORM_ID, fmt: str = 'compact',
+                          batch_size: int = IMPORT_BATCH_SIZE, progress=None) -> Dict[str, int]:
+    """Regrava responses.data de respostas existentes no formato indicado, em lotes"""
+    stats = {'rows': 0, 'changed': 0, 'bytes_before': 0, 'bytes_after': 0}
+    conn = connect_form_db(form_id)
+    c = conn.cursor()
+    last_id = 0
+    while True:
+        c.execute("SELECT id, data FROM responses WHERE form_id=? AND id > ? ORDER BY id LIMIT ?",
+                  (form_id, last_id, batch_size))
+        rows = c.fetchall()
+        if not rows:
+            break
+        last_id = rows[-1][0]
+        
+        decoded = [(row[0], row[1], decode_response_data(row[1], form_id)) for row in rows]
+        if fmt == 'compact':
+            # Chaves novas são confirmadas antes da transação do lote
+            ensure_response_keys(form_id, {name for _, _, data in decoded for name in data})
+        
+        updates = []
+        for response_id, raw, data in decoded:
+            encoded = encode_response_data(data, form_id, fmt)
+            before = len(raw.encode('utf-8')) if isinstance(raw, str) else len(raw)
+            after = len(encoded.encode('utf-8')) if isinstance(encoded, str) else len(encoded)
+            stats['rows'] += 1
+            stats['bytes_before'] += before
+            stats['bytes_after'] += after
+            if encoded != raw:
+                updates.append((encoded, response_id))
+        
+        if updates:
+            c.executemany("UPDATE responses SET data=? WHERE id=?", updates)
+            conn.commit()
+            stats['changed'] += len(updates)
+        if progress:
+            progress(stats)
+    conn.close()
+    return stats
 
 # ============================================================================
 # FUNÇÕES DE BANCO DE DADOS
 # ============================================================================
 
 def get_config(key: str) -> Optional[str]:
-    """Busca valor de configuração"""
+    """Busca valor de configuração global"""
     conn = sqlite3.connect(DB_PATH)
     c = conn.cursor()
     c.execute("SELECT value FROM config WHERE key=?", (key,))
@@ -112,18 +614,36 @@ def get_config(key: str) -> Optional[str]:
     return result[0] if result else None
 
 def set_config(key: str, value: str):
-    """Define valor de configuração"""
+    """Define valor de configuração global"""
     conn = sqlite3.connect(DB_PATH)
     c = conn.cursor()
     c.execute("INSERT OR REPLACE INTO config VALUES (?, ?)", (key, value))
     conn.commit()
     conn.close()
 
-def get_fields() -> List[Dict]:
+def get_form_config(form_id: str, key: str) -> Optional[str]:
+    """Busca valor de configuração do formulário"""
+    conn = connect_form_db(form_id)
+    c = conn.cursor()
+    c.execute("SELECT value FROM form_config WHERE form_id=? AND key=?", (form_id, key))
+    result = c.fetchone()
+    conn.close()
+    return result[0] if result else None
+
+def set_form_config(form_id: str, key: str, value: str):
+    """Define valor de configuração do formulário"""
+    conn = connect_form_db(form_id)
+    c = conn.cursor()
+    c.execute("INSERT OR REPLACE INTO form_config VALUES (?, ?, ?)", (form_id, key, value))
+    conn.commit()
+    conn.close()
+
+def get_fields(form_id: str = DEFAULT_FORM_ID) -> List[Dict]:
     """Retorna todos os campos ordenados por posição"""
-    conn = sqlite3.connect(DB_PATH)
+    conn = connect_form_db(form_id)
     c = conn.cursor()
-    c.execute("SELECT * FROM fields ORDER BY position")
+    c.execute('''SELECT id, name, label, field_type, required, options, position, is_default
+                 FROM fields WHERE form_id=? ORDER BY position''', (form_id,))
     fields = []
     for row in c.fetchall():
         fields.append({
@@ -139,61 +659,114 @@ def get_fields() -> List[Dict]:
     conn.close()
     return fields
 
-def add_field(name: str, label: str, field_type: str, required: bool, options: Optional[List[str]] = None):
+def add_field(name: str, label: str, field_type: str, required: bool, options: Optional[List[str]] = None,
+              form_id: str = DEFAULT_FORM_ID):
     """Adiciona novo campo"""
-    conn = sqlite3.connect(DB_PATH)
+    conn = connect_form_db(form_id)
     c = conn.cursor()
-    c.execute("SELECT MAX(position) FROM fields")
+    c.execute("SELECT MAX(position) FROM fields WHERE form_id=?", (form_id,))
     max_pos = c.fetchone()[0] or 0
     
     options_json = json.dumps(options) if options else None
-    c.execute('''INSERT INTO fields (name, label, field_type, required, options, position)
-                 VALUES (?, ?, ?, ?, ?, ?)''',
-              (name, label, field_type, int(required), options_json, max_pos + 1))
+    c.execute('''INSERT INTO fields (name, label, field_type, required, options, position, form_id)
+                 VALUES (?, ?, ?, ?, ?, ?, ?)''',
+              (name, label, field_type, int(required), options_json, max_pos + 1, form_id))
     conn.commit()
     conn.close()
 
-def delete_field(field_id: int):
+def delete_field(field_id: int, form_id: str = DEFAULT_FORM_ID):
     """Remove campo"""
-    conn = sqlite3.connect(DB_PATH)
+    conn = connect_form_db(form_id)
     c = conn.cursor()
-    c.execute("DELETE FROM fields WHERE id=? AND is_default=0", (field_id,))
+    c.execute("DELETE FROM fields WHERE id=? AND form_id=? AND is_default=0", (field_id, form_id))
     conn.commit()
     conn.close()
 
-def update_field_positions(field_ids: List[int]):
+def update_field_positions(field_ids: List[int], form_id: str = DEFAULT_FORM_ID):
     """Atualiza posições dos campos"""
-    conn = sqlite3.connect(DB_PATH)
+    conn = connect_form_db(form_id)
     c = conn.cursor()
     for pos, field_id in enumerate(field_ids, 1):
-        c.execute("UPDATE fields SET position=? WHERE id=?", (pos, field_id))
+        c.execute("UPDATE fields SET position=? WHERE id=? AND form_id=?", (pos, field_id, form_id))
     conn.commit()
     conn.close()
 
-def save_response(data: Dict, files: List[str]):
+def save_response(data: Dict, files: List[str], form_id: str = DEFAULT_FORM_ID):
     """Salva resposta no banco"""
-    conn = sqlite3.connect(DB_PATH)
+    encoded = encode_response_data(data, form_id)
+    conn = connect_form_db(form_id)
     c = conn.cursor()
-    c.execute("INSERT INTO responses (data, files) VALUES (?, ?)",
-              (json.dumps(data), json.dumps(files)))
+    c.execute("INSERT INTO responses (data, files, form_id) VALUES (?, ?, ?)",
+              (encoded, json.dumps(files), form_id))
     conn.commit()
     response_id = c.lastrowid
     conn.close()
     return response_id
 
-def get_responses() -> List[Dict]:
-    """Retorna todas as respostas"""
-    conn = sqlite3.connect(DB_PATH)
+def update_response_files(response_id: int, files: List[str], form_id: str = DEFAULT_FORM_ID,
+                          hashes: Optional[Dict[str, str]] = None):
+    """Atualiza os caminhos dos arquivos de uma resposta (e o SHA-256 de cada um)"""
+    conn = connect_form_db(form_id)
     c = conn.cursor()
-    c.execute("SELECT * FROM responses ORDER BY created_at DESC")
+    c.execute("UPDATE responses SET files=?, file_hashes=? WHERE id=? AND form_id=?",
+              (json.dumps(files), json.dumps(hashes) if hashes else None, response_id, form_id))
+    conn.commit()
+    conn.close()
+
+def delete_response(response_id: int, form_id: str = DEFAULT_FORM_ID):
+    """Remove resposta e seus arquivos"""
+    conn = connect_form_db(form_id)
+    c = conn.cursor()
+    c.execute("SELECT files FROM responses WHERE id=? AND form_id=?", (response_id, form_id))
+    row = c.fetchone()
+    c.execute("DELETE FROM responses WHERE id=? AND form_id=?", (response_id, form_id))
+    conn.commit()
+    conn.close()
+    
+    if row and row[0]:
+        remove_uploaded_files(json.loads(row[0]))
+
+def _response_from_row(row, form_id: str) -> Dict:
+    """Converte linha (id, data, files, created_at) em dicionário de resposta"""
+    return {
+        'id': row[0],
+        'data': decode_response_data(row[1], form_id),
+        'files': json.loads(row[2]) if row[2] else [],
+        'created_at': row[3]
+    }
+
+def get_response(response_id: int, form_id: str = DEFAULT_FORM_ID) -> Optional[Dict]:
+    """Retorna uma resposta pelo ID"""
+    conn = connect_form_db(form_id)
+    c = conn.cursor()
+    c.execute("SELECT id, data, files, created_at FROM responses WHERE id=? AND form_id=?",
+              (response_id, form_id))
+    row = c.fetchone()
+    conn.close()
+    return _response_from_row(row, form_id) if row else None
+
+def get_responses(form_id: str = DEFAULT_FORM_ID, date_from: Optional[str] = None,
+                  date_to: Optional[str] = None, search: Optional[str] = None) -> List[Dict]:
+    """Retorna as respostas, opcionalmente filtradas por período (AAAA-MM-DD) e texto"""
+    query = "SELECT id, data, files, created_at FROM responses WHERE form_id=?"
+    params = [form_id]
+    if date_from:
+        query += " AND created_at >= ?"
+        params.append(date_from)
+    if date_to:
+        query += " AND created_at < date(?, '+1 day')"
+        params.append(date_to)
+    
+    conn = connect_form_db(form_id)
+    c = conn.cursor()
+    c.execute(query + " ORDER BY created_at DESC", params)
     responses = []
+    needle = search.strip().lower() if search else ''
     for row in c.fetchall():
-        responses.append({
-            'id': row[0],
-            'data': json.loads(row[1]),
-            'files': json.loads(row[2]) if row[2] else [],
-            'created_at': row[3]
-        })
+        response = _response_from_row(row, form_id)
+        if needle and not any(needle in str(v).lower() for v in response['data'].values()):
+            continue
+        responses.append(response)
     conn.close()
     return responses
 
@@ -221,8 +794,8 @@ def send_email_with_retry(subject: str, body: str, attachments: List[str], max_r
             
             # Anexar arquivos
             for filepath in attachments:
-                if os.path.exists(filepath):
-                    with open(filepath, 'rb') as f:
+                if os.path.exists(stored_upload_path(filepath)):
+                    with open_upload(filepath) as f:
                         part = MIMEBase('application', 'octet-stream')
                         part.set_payload(f.read())
                         encoders.encode_base64(part)
@@ -287,51 +860,1055 @@ def format_email_body(data: Dict, fields: List[Dict]) -> str:
     return html
 
 # ============================================================================
-# FUNÇÕES DE UPLOAD E VALIDAÇÃO
+# NOTIFICAÇÕES EM RESUMO (DIGEST)
+# ============================================================================
+
+def get_notification_settings(form_id: str) -> Dict[str, Any]:
+    """Política de notificação do formulário: imediata ou resumo periódico"""
+    conn = connect_form_db(form_id)
+    c = conn.cursor()
+    c.execute('''SELECT key, value FROM form_config WHERE form_id=? AND key IN
+                 ('notify_mode', 'digest_minutes', 'digest_count', 'digest_last_id', 'digest_last_sent')''',
+              (form_id,))
+    values = dict(c.fetchall())
+    conn.close()
+    return {
+        'mode': values.get('notify_mode') or 'immediate',
+        'minutes': int(values.get('digest_minutes') or DIGEST_DEFAULT_MINUTES),
+        'count': int(values.get('digest_count') or DIGEST_DEFAULT_COUNT),
+        'last_id': int(values.get('digest_last_id') or 0),
+        'last_sent': float(values.get('digest_last_sent') or 0)
+    }
+
+def set_notification_settings(form_id: str, mode: str, minutes: int, count: int):
+    """Salva a política; ao ativar o resumo, respostas antigas não entram nele"""
+    previous = get_notification_settings(form_id)
+    set_form_config(form_id, 'notify_mode', mode)
+    set_form_config(form_id, 'digest_minutes', str(int(minutes)))
+    set_form_config(form_id, 'digest_count', str(int(count)))
+    
+    if mode == 'digest' and previous['mode'] != 'digest':
+        conn = connect_form_db(form_id)
+        c = conn.cursor()
+        c.execute("SELECT COALESCE(MAX(id), 0) FROM responses WHERE form_id=?", (form_id,))
+        max_id = c.fetchone()[0]
+        conn.close()
+        set_form_config(form_id, 'digest_last_id', str(max_id))
+        set_form_config(form_id, 'digest_last_sent', str(time.time()))
+
+def format_digest_body(responses: List[Dict], fields: List[Dict], form_id: str,
+                       attached: bool) -> str:
+    """Formata resumo em HTML com uma linha por resposta"""
+    columns = [f for f in fields if f['field_type'] != 'file']
+    title = get_form_config(form_id, 'title') or 'Ribeiro Forms'
+    
+    html = f"""
+    <html>
+    <head>
+        <style>
+            body {{ font-family: Arial, sans-serif; }}
+            .header {{ background-color: #4CAF50; color: white; padding: 20px; }}
+            .content {{ padding: 20px; }}
+            table {{ border-collapse: collapse; width: 100%; }}
+            th {{ background-color: #f2f2f2; color: #333; text-align: left; }}
+            th, td {{ border: 1px solid #ddd; padding: 6px; color: #666; vertical-align: top; }}
+        </style>
+    </head>
+    <body>
+        <div class="header">
+            <h2>Resumo de Respostas - {title}</h2>
+            <p>{len(responses)} nova(s) resposta(s) até {datetime.now().strftime('%d/%m/%Y às %H:%M:%S')}</p>
+        </div>
+        <div class="content">
+        <table>
+            <tr><th>#</th><th>Recebido em</th>
+    """
+    html += ''.join(f"<th>{field['label']}</th>" for field in columns) + "<th>Arquivos</th></tr>"
+    
+    for response in responses:
+        html += f"<tr><td>{response['id']}</td><td>{response['created_at']}</td>"
+        for field in columns:
+            value = response['data'].get(field['name'], '')
+            if field['field_type'] == 'checkbox':
+                value = "✓ Sim" if value else "✗ Não"
+            html += f"<td>{value}</td>"
+        
+        names = ', '.join(os.path.basename(f) for f in response['files'])
+        if response['files'] and not attached and API_PUBLIC_URL:
+            url = build_download_url(form_id, 'attachments.zip', ttl=DIGEST_LINK_TTL, response=response['id'])
+            names = f'<a href="{url}">{names}</a>'
+        html += f"<td>{names}</td></tr>"
+    
+    html += """
+        </table>
+        </div>
+    </body>
+    </html>
+    """
+    return html
+
+def _encoded_attachment_size(size: int) -> int:
+    """Tamanho do anexo no email: base64 (4/3), quebras de linha a cada 76 colunas e cabeçalhos"""
+    encoded = (size + 2) // 3 * 4
+    return encoded + encoded // 76 * 2 + 512
+
+def send_digest(form_id: str, force: bool = False) -> int:
+    """Envia o resumo se estiver vencido (tempo ou quantidade); retorna respostas enviadas"""
+    settings = get_notification_settings(form_id)
+    if settings['mode'] != 'digest' and not force:
+        return 0
+    
+    conn = connect_form_db(form_id)
+    c = conn.cursor()
+    # Respostas importadas são históricas e não entram no resumo
+    c.execute("SELECT COUNT(*), COALESCE(MAX(id), 0) FROM responses WHERE form_id=? AND id > ? AND imported=0",
+              (form_id, settings['last_id']))
+    pending, max_id = c.fetchone()
+    due = pending and (force or pending >= settings['count']
+                       or time.time() - settings['last_sent'] >= settings['minutes'] * 60)
+    if not due:
+        conn.close()
+        return 0
+    
+    # Reivindicar o lote: só um processo (Streamlit, API ou worker) envia cada resumo
+    c.execute("INSERT OR IGNORE INTO form_config VALUES (?, 'digest_last_id', '0')", (form_id,))
+    c.execute("UPDATE form_config SET value=? WHERE form_id=? AND key='digest_last_id' AND value=?",
+              (str(max_id), form_id, str(settings['last_id'])))
+    conn.commit()
+    claimed = c.rowcount == 1
+    
+    if claimed:
+        c.execute('''SELECT id, data, files, created_at FROM responses
+                     WHERE form_id=? AND id > ? AND id <= ? AND imported=0 ORDER BY id''',
+                  (form_id, settings['last_id'], max_id))
+        responses = [_response_from_row(row, form_id) for row in c.fetchall()]
+    conn.close()
+    if not claimed:
+        return 0
+    
+    try:
+        fields = get_fields(form_id)
+        attachments = [f for r in responses for f in r['files'] if os.path.exists(stored_upload_path(f))]
+        body = format_digest_body(responses, fields, form_id, attached=True)
+        attached = (len(body.encode('utf-8')) + sum(_encoded_attachment_size(upload_size(f)) for f in attachments)
+                    <= DIGEST_MAX_MESSAGE_SIZE)
+        if not attached:
+            body = format_digest_body(responses, fields, form_id, attached=False)
+        subject = f"Resumo: {len(responses)} nova(s) resposta(s) - Ribeiro Forms"
+        if form_id != DEFAULT_FORM_ID:
+            subject += f" [{form_id}]"
+        send_email_with_retry(subject, body, attachments if attached else [])
+    except Exception:
+        # Devolver o lote para a próxima tentativa
+        conn = connect_form_db(form_id)
+        conn.execute("UPDATE form_config SET value=? WHERE form_id=? AND key='digest_last_id' AND value=?",
+                     (str(settings['last_id']), form_id, str(max_id)))
+        conn.commit()
+        conn.close()
+        raise
+    
+    set_form_config(form_id, 'digest_last_sent', str(time.time()))
+    return len(responses)
+
+def send_due_digests() -> int:
+    """Envia os resumos vencidos de todos os formulários"""
+    sent = 0
+    for form in get_forms():
+        try:
+            sent += send_digest(form['id'])
+        except Exception:
+            logger.exception("Falha ao enviar resumo do formulário %s", form['id'])
+    return sent
+
+_digest_wakeup = threading.Event()
+
+def start_digest_worker() -> threading.Thread:
+    """Thread que envia resumos vencidos por tempo ou quando uma submissão a acorda"""
+    def loop():
+        while True:
+            _digest_wakeup.wait(DIGEST_CHECK_INTERVAL)
+            _digest_wakeup.clear()
+            send_due_digests()
+    
+    worker = threading.Thread(target=loop, name="digest-worker", daemon=True)
+    worker.start()
+    return worker
+
+# ============================================================================
+# WEBHOOKS
+# ============================================================================
+
+_webhook_wakeup = threading.Event()
+_webhook_http = threading.local()
+
+def get_webhooks(form_id: str) -> List[Dict]:
+    """Retorna os webhooks do formulário com a contagem de entregas pendentes e falhas"""
+    conn = connect_form_db(form_id)
+    c = conn.cursor()
+    c.execute('''SELECT w.id, w.url, w.secret, w.fields, w.active,
+                        SUM(o.status = 'pending'), SUM(o.status = 'failed')
+                 FROM webhooks w LEFT JOIN webhook_outbox o ON o.webhook_id = w.id
+                 WHERE w.form_id=? GROUP BY w.id ORDER BY w.id''', (form_id,))
+    webhooks = [{
+        'id': row[0],
+        'url': row[1],
+        'secret': row[2],
+        'fields': json.loads(row[3]) if row[3] else None,
+        'active': bool(row[4]),
+        'pending': row[5] or 0,
+        'failed': row[6] or 0
+    } for row in c.fetchall()]
+    conn.close()
+    return webhooks
+
+def add_webhook(form_id: str, url: str, secret: Optional[str] = None,
+                fields: Optional[List[str]] = None) -> str:
+    """Cadastra webhook; retorna o segredo usado nas assinaturas"""
+    if not url.startswith(('http://', 'https://')):
+        raise ValueError("A URL deve começar com http:// ou https://")
+    secret = secret or secrets.token_hex(32)
+    conn = connect_form_db(form_id)
+    c = conn.cursor()
+    c.execute("INSERT INTO webhooks (form_id, url, secret, fields) VALUES (?, ?, ?, ?)",
+              (form_id, url, secret, json.dumps(fields) if fields else None))
+    conn.commit()
+    conn.close()
+    return secret
+
+def delete_webhook(webhook_id: int, form_id: str):
+    """Remove webhook e suas entregas pendentes"""
+    conn = connect_form_db(form_id)
+    c = conn.cursor()
+    c.execute("DELETE FROM webhook_outbox WHERE webhook_id=? AND form_id=?", (webhook_id, form_id))
+    c.execute("DELETE FROM webhooks WHERE id=? AND form_id=?", (webhook_id, form_id))
+    conn.commit()
+    conn.close()
+
+def retry_failed_webhooks(webhook_id: int, form_id: str):
+    """Recoloca na fila as entregas que esgotaram as tentativas"""
+    conn = connect_form_db(form_id)
+    c = conn.cursor()
+    c.execute('''UPDATE webhook_outbox SET status='pending', attempts=0, next_attempt_at=?, claimed_by=NULL
+                 WHERE webhook_id=? AND form_id=? AND status=?''',
+              (time.time(), webhook_id, form_id, 'failed'))
+    conn.commit()
+    conn.close()
+    _webhook_wakeup.set()
+
+def enqueue_webhooks(response_id: int, form_id: str = DEFAULT_FORM_ID):
+    """Agenda a entrega da resposta para os webhooks ativos (não bloqueia o formulário)"""
+    conn = connect_form_db(form_id)
+    c = conn.cursor()
+    c.execute("SELECT id FROM webhooks WHERE form_id=? AND active=1", (form_id,))
+    webhook_ids = [row[0] for row in c.fetchall()]
+    if webhook_ids:
+        now = time.time()
+        c.executemany('''INSERT INTO webhook_outbox (form_id, webhook_id, response_id, next_attempt_at)
+                         VALUES (?, ?, ?, ?)''', [(form_id, wid, response_id, now) for wid in webhook_ids])
+        conn.commit()
+        _webhook_wakeup.set()
+    conn.close()
+
+def sign_webhook_payload(secret: str, timestamp: str, body: bytes) -> str:
+    """Assinatura HMAC-SHA256 de '<timestamp>.<corpo>' enviada em X-Ribeiro-Signature"""
+    return "sha256=" + hmac.new(secret.encode(), timestamp.encode() + b'.' + body, hashlib.sha256).hexdigest()
+
+def _http_post(url: str, body: bytes, headers: Dict[str, str], timeout: float = WEBHOOK_TIMEOUT) -> int:
+    """POST reaproveitando conexões keep-alive por thread e por host"""
+    parsed = urlparse(url)
+    key = (parsed.scheme, parsed.netloc)
+    path = (parsed.path or '/') + (f"?{parsed.query}" if parsed.query else '')
+    if not hasattr(_webhook_http, 'connections'):
+        _webhook_http.connections = {}
+    connections = _webhook_http.connections
+    
+    for attempt in range(2):
+        conn = connections.get(key)
+        if conn is None:
+            cls = http.client.HTTPSConnection if parsed.scheme == 'https' else http.client.HTTPConnection
+            conn = connections[key] = cls(parsed.netloc, timeout=timeout)
+        try:
+            conn.request('POST', path, body, headers)
+            response = conn.getresponse()
+            response.read()
+            if response.will_close:
+                conn.close()
+                connections.pop(key, None)
+            return response.status
+        except (http.client.RemoteDisconnected, BrokenPipeError, ConnectionResetError):
+            # Conexão keep-alive fechada pelo servidor: tentar uma vez com conexão nova
+            conn.close()
+            connections.pop(key, None)
+            if attempt:
+                raise
+        except Exception:
+            conn.close()
+            connections.pop(key, None)
+            raise
+
+def _deliver_webhook_batch(db_path: str, webhook: Dict, deliveries: List[Tuple[int, int, int]], token: str):
+    """Entrega um lote de respostas a um webhook e atualiza a fila (se a reivindicação ainda for nossa)"""
+    response_ids = sorted({d[1] for d in deliveries})
+    conn = sqlite3.connect(db_path)
+    c = conn.cursor()
+    placeholders = ','.join('?' * len(response_ids))
+    c.execute(f"SELECT id, data, files, created_at FROM responses WHERE form_id=? AND id IN ({placeholders})",
+              [webhook['form_id']] + response_ids)
+    responses = [_response_from_row(row, webhook['form_id']) for row in c.fetchall()]
+    conn.close()
+    
+    error = None
+    if responses:
+        payload = {
+            'event': 'responses.created',
+            'form_id': webhook['form_id'],
+            'responses': [{
+                'id': r['id'],
+                'created_at': r['created_at'],
+                'data': {k: v for k, v in r['data'].items()
+                         if not webhook['fields'] or k in webhook['fields']},
+                'files': [os.path.basename(f) for f in r['files']]
+            } for r in responses]
+        }
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        timestamp = str(int(time.time()))
+        headers = {
+            'Content-Type': 'application/json; charset=utf-8',
+            'User-Agent': 'RibeiroForms-Webhook/1.0',
+            'X-Ribeiro-Event': 'responses.created',
+            'X-Ribeiro-Timestamp': timestamp,
+            'X-Ribeiro-Signature': sign_webhook_payload(webhook['secret'], timestamp, body)
+        }
+        try:
+            status = _http_post(webhook['url'], body, headers)
+            if not 200 <= status < 300:
+                error = f"HTTP {status}"
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+    
+    # Vencido o lease, outro processo pode ter reivindicado as entregas: o resultado dele prevalece
+    conn = sqlite3.connect(db_path)
+    c = conn.cursor()
+    if error is None:
+        c.executemany("DELETE FROM webhook_outbox WHERE id=? AND claimed_by=?", [(d[0], token) for d in deliveries])
+    else:
+        now = time.time()
+        for outbox_id, _, attempts in deliveries:
+            attempts += 1
+            if attempts >= WEBHOOK_MAX_ATTEMPTS:
+                c.execute("UPDATE webhook_outbox SET status='failed', attempts=?, last_error=? WHERE id=? AND claimed_by=?",
+                          (attempts, error, outbox_id, token))
+            else:
+                # Backoff exponencial com jitter
+                delay = min(WEBHOOK_MAX_BACKOFF, 2 ** attempts) + random.uniform(0, 1)
+                c.execute('''UPDATE webhook_outbox SET attempts=?, next_attempt_at=?, last_error=?, claimed_by=NULL
+                             WHERE id=? AND claimed_by=?''', (attempts, now + delay, error, outbox_id, token))
+        logger.warning("Falha no webhook %s: %s", webhook['url'], error)
+    conn.commit()
+    conn.close()
+
+def dispatch_webhooks_once(executor: ThreadPoolExecutor,
+                           in_flight: Optional[Dict[Tuple[str, int], Future]] = None) -> int:
+    """Reivindica um lote por webhook livre e o entrega; retorna quantas entregas foram reivindicadas
+    
+    Com in_flight (dispatcher contínuo) não espera pelos envios: webhooks com lote em andamento
+    ficam de fora e só se reivindica o que os workers livres enviam de imediato, então um endpoint
+    lento não atrasa os demais nem segura entregas além do lease. Sem in_flight (--once) espera
+    os envios e repete até a fila vencida esvaziar.
+    """
+    wait = in_flight is None
+    if wait:
+        in_flight = {}
+    claimed_total = 0
+    
+    while True:
+        for key in [k for k, future in in_flight.items() if future.done()]:
+            del in_flight[key]
+        
+        claimed = 0
+        db_paths = sorted({get_form_db_path(f['id']) for f in get_forms()})
+        for db_path in db_paths:
+            free = WEBHOOK_WORKERS - len(in_flight)
+            if free <= 0:
+                break
+            now = time.time()
+            conn = sqlite3.connect(db_path)
+            c = conn.cursor()
+            # Webhooks com entregas vencidas, pela entrega mais antiga
+            c.execute('''SELECT webhook_id FROM webhook_outbox
+                         WHERE status='pending' AND next_attempt_at <= ?
+                         GROUP BY webhook_id ORDER BY MIN(id)''', (now,))
+            due = [row[0] for row in c.fetchall() if (db_path, row[0]) not in in_flight][:free]
+            
+            for webhook_id in due:
+                token = secrets.token_hex(8)
+                # Reivindicação atômica: outro processo não pega as mesmas entregas durante o lease
+                c.execute('''UPDATE webhook_outbox SET claimed_by=?, next_attempt_at=?
+                             WHERE id IN (SELECT id FROM webhook_outbox
+                                          WHERE webhook_id=? AND status='pending' AND next_attempt_at <= ?
+                                          ORDER BY id LIMIT ?)''',
+                          (token, now + WEBHOOK_LEASE, webhook_id, now, WEBHOOK_BATCH_SIZE))
+                conn.commit()
+                c.execute("SELECT id, response_id, attempts FROM webhook_outbox WHERE claimed_by=? ORDER BY id",
+                          (token,))
+                deliveries = c.fetchall()
+                c.execute("SELECT id, form_id, url, secret, fields FROM webhooks WHERE id=?", (webhook_id,))
+                row = c.fetchone()
+                if not deliveries or row is None:
+                    continue
+                webhook = {'id': row[0], 'form_id': row[1], 'url': row[2], 'secret': row[3],
+                           'fields': json.loads(row[4]) if row[4] else None}
+                
+                future = executor.submit(_deliver_webhook_batch, db_path, webhook, deliveries, token)
+                # Webhook livre de novo: o dispatcher volta a reivindicar sem esperar o intervalo
+                future.add_done_callback(lambda _: _webhook_wakeup.set())
+                in_flight[(db_path, webhook_id)] = future
+                claimed += len(deliveries)
+            conn.close()
+        
+        claimed_total += claimed
+        if not wait or not in_flight:
+            return claimed_total
+        for future in in_flight.values():
+            try:
+                future.result()
+            except Exception:
+                logger.exception("Erro ao processar lote de webhook")
+
+def start_webhook_dispatcher() -> threading.Thread:
+    """Thread que entrega os webhooks pendentes usando um pool limitado de conexões"""
+    executor = ThreadPoolExecutor(max_workers=WEBHOOK_WORKERS, thread_name_prefix="webhook")
+    in_flight = {}
+    
+    def loop():
+        while True:
+            try:
+                claimed = dispatch_webhooks_once(executor, in_flight)
+            except Exception:
+                logger.exception("Erro no despacho de webhooks")
+                claimed = 0
+            if not claimed:
+                _webhook_wakeup.wait(WEBHOOK_POLL_INTERVAL)
+                _webhook_wakeup.clear()
+    
+    worker = threading.Thread(target=loop, name="webhook-dispatcher", daemon=True)
+    worker.start()
+    return worker
+
+# ============================================================================
+# FUNÇÕES DE UPLOAD E VALIDAÇÃO
+# ============================================================================
+
+def check_file_signature(ext: str, head: bytes) -> bool:
+    """Confere se o início do conteúdo corresponde à extensão declarada"""
+    if ext in TEXT_EXTENSIONS:
+        # Texto puro não tem assinatura; basta não parecer binário (UTF-16 com BOM é aceito)
+        return head.startswith((b'\xff\xfe', b'\xfe\xff')) or b'\x00' not in head
+    signatures = FILE_SIGNATURES.get(ext)
+    if not signatures:
+        return True
+    return any(head[offset:offset + len(prefix)] == prefix for offset, prefix in signatures)
+
+def validate_file(uploaded_file) -> tuple[bool, str]:
+    """Valida arquivo enviado"""
+    if uploaded_file.size > MAX_FILE_SIZE:
+        return False, f"Arquivo muito grande. Máximo: 25MB"
+    
+    ext = uploaded_file.name.split('.')[-1].lower()
+    if ext not in ALLOWED_EXTENSIONS:
+        return False, f"Tipo de arquivo não permitido. Permitidos: {', '.join(ALLOWED_EXTENSIONS)}"
+    
+    head = bytes(uploaded_file.getbuffer()[:SIGNATURE_SNIFF_SIZE])
+    if not check_file_signature(ext, head):
+        return False, f"O conteúdo não corresponde a um arquivo .{ext}"
+    
+    return True, ""
+
+def _worth_compressing(content) -> bool:
+    """Testa a compressão numa amostra do início para não gastar CPU com o arquivo inteiro à toa"""
+    if len(content) <= COMPRESSION_SAMPLE_SIZE:
+        return True
+    sample = content[:COMPRESSION_SAMPLE_SIZE]
+    return len(zlib.compress(sample, 6)) <= len(sample) * (1 - COMPRESSION_MIN_SAVING)
+
+def save_uploaded_file(uploaded_file, response_id: int, form_id: str = DEFAULT_FORM_ID,
+                       name: Optional[str] = None) -> Tuple[str, str, int]:
+    """Salva arquivo enviado; retorna (caminho, SHA-256 do conteúdo, bytes gravados em disco)"""
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    filename = f"{response_id}_{timestamp}_{name or uploaded_file.name}"
+    filepath = os.path.join(get_form_upload_dir(form_id), filename)
+    
+    content = uploaded_file.getbuffer()
+    digest = hashlib.sha256(content).hexdigest()
+    ext = uploaded_file.name.split('.')[-1].lower()
+    if ext in COMPRESSIBLE_EXTENSIONS and _worth_compressing(content):
+        compressed = gzip.compress(content, compresslevel=6, mtime=0)
+        if len(compressed) <= len(content) * (1 - COMPRESSION_MIN_SAVING):
+            with open(filepath + COMPRESSED_SUFFIX, 'wb') as f:
+                f.write(compressed)
+            return filepath, digest, len(compressed)
+    
+    with open(filepath, 'wb') as f:
+        f.write(content)
+    
+    return filepath, digest, len(content)
+
+def stored_upload_path(filepath: str) -> str:
+    """Caminho físico de um upload (com .gz quando gravado comprimido)"""
+    if os.path.exists(filepath):
+        return filepath
+    compressed = filepath + COMPRESSED_SUFFIX
+    return compressed if os.path.exists(compressed) else filepath
+
+def upload_size(filepath: str) -> int:
+    """Tamanho original do upload, mesmo quando gravado comprimido"""
+    physical = stored_upload_path(filepath)
+    if not physical.endswith(COMPRESSED_SUFFIX):
+        return os.path.getsize(physical)
+    # O rodapé do gzip guarda o tamanho original (módulo 2^32, suficiente para MAX_FILE_SIZE)
+    with open(physical, 'rb') as f:
+        f.seek(-4, os.SEEK_END)
+        return int.from_bytes(f.read(4), 'little')
+
+def open_upload(filepath: str):
+    """Abre upload para leitura binária, descomprimindo em streaming se necessário"""
+    physical = stored_upload_path(filepath)
+    if physical.endswith(COMPRESSED_SUFFIX):
+        return gzip.open(physical, 'rb')
+    return open(physical, 'rb')
+
+def remove_uploaded_files(file_paths: List[str]):
+    """Remove arquivos enviados e desconta do uso de armazenamento"""
+    freed = 0
+    for filepath in file_paths:
+        try:
+            physical = stored_upload_path(filepath)
+            freed += os.path.getsize(physical)
+            os.remove(physical)
+        except FileNotFoundError:
+            continue
+    if freed:
+        add_upload_usage(-freed)
+
+class SubmittedFile:
+    """Arquivo recebido fora do Streamlit, com a mesma interface do UploadedFile"""
+    
+    def __init__(self, name: str, content: bytes):
+        # Nunca confiar em caminhos enviados pelo cliente
+        self.name = os.path.basename(name.replace('\\', '/'))
+        self._content = content
+    
+    @property
+    def size(self) -> int:
+        return len(self._content)
+    
+    def getbuffer(self) -> memoryview:
+        return memoryview(self._content)
+
+# ============================================================================
+# ARMAZENAMENTO: COTAS E COLETA DE LIXO DE UPLOADS
+# ============================================================================
+
+def get_upload_usage() -> int:
+    """Bytes ocupados em uploads (contador recalculado a cada ciclo da coleta)"""
+    return int(get_config('uploads_bytes') or 0)
+
+def add_upload_usage(delta: int):
+    """Soma (ou desconta) bytes do contador de uso de uploads"""
+    conn = sqlite3.connect(DB_PATH)
+    c = conn.cursor()
+    c.execute('''INSERT INTO config VALUES ('uploads_bytes', MAX(0, ?))
+                 ON CONFLICT(key) DO UPDATE SET value = MAX(0, CAST(value AS INTEGER) + ?)''',
+              (delta, delta))
+    conn.commit()
+    conn.close()
+
+def _is_referenced(c, form_id: str, filepath: str, filename: str, refs: Dict[int, set]) -> bool:
+    """Verifica se o arquivo consta em responses.files da resposta indicada no nome"""
+    prefix = filename.split('_', 1)[0]
+    if not prefix.isdigit():
+        return False
+    
+    response_id = int(prefix)
+    if response_id not in refs:
+        c.execute("SELECT files FROM responses WHERE id=? AND form_id=?", (response_id, form_id))
+        row = c.fetchone()
+        refs[response_id] = set(json.loads(row[0])) if row and row[0] else set()
+    return filepath in refs[response_id]
+
+# Listagem ordenada de cada pasta de uploads, feita uma única vez por ciclo da coleta
+_gc_listings: Dict[str, Any] = {'cycle': None, 'dirs': {}}
+
+def _gc_listing(cycle: str, upload_dir: str) -> List[str]:
+    """Nomes de upload_dir em ordem; arquivos criados depois da listagem ficam para o próximo ciclo"""
+    if _gc_listings['cycle'] != cycle:
+        _gc_listings['cycle'], _gc_listings['dirs'] = cycle, {}
+    dirs = _gc_listings['dirs']
+    if upload_dir not in dirs:
+        dirs[upload_dir] = sorted(os.listdir(upload_dir))
+    return dirs[upload_dir]
+
+def collect_upload_garbage(max_entries: int = GC_BATCH_SIZE, min_age: int = GC_MIN_AGE,
+                           dry_run: bool = False, cursor: Optional[Dict] = None) -> Dict[str, Any]:
+    """Remove arquivos de uploads/ sem resposta associada, em lotes incrementais
+    
+    Cada chamada analisa no máximo max_entries arquivos e continua de onde a
+    anterior parou. Ao completar uma volta, o contador de uso é recalculado.
+    No mesmo processo (gc --all, painel), as pastas são listadas uma vez por volta.
+    """
+    if cursor is None:
+        cursor = json.loads(get_config('gc_cursor') or '{}')
+    cycle = cursor.get('cycle') or secrets.token_hex(8)
+    stats = {'scanned': 0, 'removed': 0, 'freed': 0, 'usage': cursor.get('usage', 0), 'cursor': None}
+    start_form, start_name = cursor.get('form', ''), cursor.get('name', '')
+    now = time.time()
+    
+    for form_id, upload_dir in sorted((f['id'], get_form_upload_dir(f['id'])) for f in get_forms()):
+        if form_id < start_form:
+            continue
+        after = start_name if form_id == start_form else ''
+        names = _gc_listing(cycle, upload_dir)
+        
+        conn = connect_form_db(form_id)
+        c = conn.cursor()
+        refs = {}
+        try:
+            for i in range(bisect.bisect_right(names, after), len(names)):
+                name = names[i]
+                if stats['scanned'] >= max_entries:
+                    stats['cursor'] = {'form': form_id, 'name': after, 'usage': stats['usage'], 'cycle': cycle}
+                    break
+                after = name
+                
+                filepath = os.path.join(upload_dir, name)
+                try:
+                    info = os.stat(filepath)
+                except FileNotFoundError:
+                    continue
+                # Subdiretórios são os uploads de outros formulários
+                if not stat.S_ISREG(info.st_mode):
+                    continue
+                stats['scanned'] += 1
+                
+                # Referências em responses.files usam o nome sem o sufixo de compressão
+                logical = filepath[:-len(COMPRESSED_SUFFIX)] if name.endswith(COMPRESSED_SUFFIX) else filepath
+                if now - info.st_mtime < min_age or _is_referenced(c, form_id, logical, name, refs):
+                    stats['usage'] += info.st_size
+                    continue
+                
+                if not dry_run:
+                    os.remove(filepath)
+                stats['removed'] += 1
+                stats['freed'] += info.st_size
+        finally:
+            conn.close()
+        
+        if stats['cursor']:
+            break
+    
+    if stats['cursor'] is None:
+        _gc_listings['cycle'], _gc_listings['dirs'] = None, {}
+    if not dry_run:
+        set_config('gc_cursor', json.dumps(stats['cursor']) if stats['cursor'] else '')
+        if stats['cursor'] is None:
+            set_config('uploads_bytes', str(stats['usage']))
+        elif stats['freed']:
+            add_upload_usage(-stats['freed'])
+    
+    return stats
+
+# ============================================================================
+# BACKUP E RESTAURAÇÃO
+# ============================================================================
+
+def _sha256_file(path: str) -> str:
+    """Hash SHA-256 de um arquivo, lido em blocos"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def backup_database(src_path: str, dst_path: str, pages: int = BACKUP_PAGES_PER_STEP,
+                    step_sleep: float = BACKUP_STEP_SLEEP):
+    """Copia um banco em uso com a API de backup online do SQLite
+    
+    Por padrão copia tudo em um passo, lendo um snapshot consistente; no modo WAL
+    as submissões continuam gravando durante a cópia. Com pages > 0 a cópia cede
+    o lock entre passos, mas recomeça a cada escrita feita por outra conexão.
+    """
+    Path(dst_path).parent.mkdir(parents=True, exist_ok=True)
+    src = sqlite3.connect(src_path)
+    dst = sqlite3.connect(dst_path)
+    try:
+        if pages > 0:
+            src.backup(dst, pages=pages, progress=lambda status, remaining, total: time.sleep(step_sleep))
+        else:
+            src.backup(dst)
+        result = dst.execute("PRAGMA quick_check").fetchone()[0]
+        if result != 'ok':
+            raise RuntimeError(f"Cópia de {src_path} corrompida: {result}")
+    finally:
+        dst.close()
+        src.close()
+
+def _object_path(objects_dir: str, digest: str) -> str:
+    """Caminho de um arquivo no armazenamento endereçado por hash"""
+    return os.path.join(objects_dir, digest[:2], digest)
+
+def create_backup(dest_dir: str, pages: int = BACKUP_PAGES_PER_STEP,
+                  step_sleep: float = BACKUP_STEP_SLEEP) -> Tuple[str, Dict[str, int]]:
+    """Cria snapshot dos bancos e snapshot incremental de uploads/ e logos/
+    
+    Arquivos são guardados uma única vez em objects/ pelo hash do conteúdo; cada
+    snapshot só tem bancos e um manifest.json apontando para os hashes.
+    """
+    snapshots_dir = os.path.join(dest_dir, 'snapshots')
+    objects_dir = os.path.join(dest_dir, 'objects')
+    snapshot_dir = os.path.join(snapshots_dir, datetime.now().strftime('%Y%m%d_%H%M%S'))
+    Path(snapshot_dir).mkdir(parents=True, exist_ok=False)
+    
+    # Manifest anterior: evita recalcular hash de arquivos que não mudaram
+    previous = {}
+    for name in sorted(os.listdir(snapshots_dir), reverse=True):
+        manifest_path = os.path.join(snapshots_dir, name, 'manifest.json')
+        if name != os.path.basename(snapshot_dir) and os.path.exists(manifest_path):
+            with open(manifest_path, encoding='utf-8') as f:
+                previous = json.load(f).get('files', {})
+            break
+    
+    manifest = {'version': 1, 'created_at': datetime.now().isoformat(timespec='seconds'),
+                'databases': {}, 'files': {}}
+    stats = {'databases': 0, 'files': 0, 'new_objects': 0, 'new_bytes': 0}
+    
+    db_paths = [DB_PATH] + [f['db_path'] for f in get_forms() if f['db_path']]
+    for db_path in db_paths:
+        rel = os.path.relpath(db_path)
+        copy_path = os.path.join(snapshot_dir, 'db', rel)
+        backup_database(db_path, copy_path, pages, step_sleep)
+        manifest['databases'][rel] = {'sha256': _sha256_file(copy_path),
+                                      'size': os.path.getsize(copy_path)}
+        stats['databases'] += 1
+    
+    for root_dir in (UPLOAD_DIR, LOGO_DIR):
+        for dirpath, _, filenames in os.walk(root_dir):
+            for filename in filenames:
+                path = os.path.join(dirpath, filename)
+                rel = os.path.relpath(path)
+                try:
+                    info = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                
+                old = previous.get(rel)
+                if old and old['size'] == info.st_size and old['mtime_ns'] == info.st_mtime_ns:
+                    digest = old['sha256']
+                else:
+                    digest = _sha256_file(path)
+                
+                object_path = _object_path(objects_dir, digest)
+                if not os.path.exists(object_path):
+                    Path(object_path).parent.mkdir(parents=True, exist_ok=True)
+                    shutil.copyfile(path, object_path + '.tmp')
+                    os.replace(object_path + '.tmp', object_path)
+                    stats['new_objects'] += 1
+                    stats['new_bytes'] += info.st_size
+                
+                manifest['files'][rel] = {'sha256': digest, 'size': info.st_size,
+                                          'mtime_ns': info.st_mtime_ns}
+                stats['files'] += 1
+    
+    # O manifest é gravado por último: snapshot sem manifest está incompleto
+    tmp_path = os.path.join(snapshot_dir, 'manifest.json.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=1)
+    os.replace(tmp_path, os.path.join(snapshot_dir, 'manifest.json'))
+    
+    return snapshot_dir, stats
+
+def verify_backup(snapshot_dir: str) -> List[str]:
+    """Confere hashes e integridade de um snapshot; retorna lista de erros"""
+    manifest_path = os.path.join(snapshot_dir, 'manifest.json')
+    if not os.path.exists(manifest_path):
+        return [f"Snapshot incompleto: {manifest_path} não encontrado"]
+    with open(manifest_path, encoding='utf-8') as f:
+        manifest = json.load(f)
+    objects_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(snapshot_dir))), 'objects')
+    errors = []
+    
+    for rel, info in manifest['databases'].items():
+        copy_path = os.path.join(snapshot_dir, 'db', rel)
+        if not os.path.exists(copy_path) or _sha256_file(copy_path) != info['sha256']:
+            errors.append(f"Banco {rel}: cópia ausente ou hash divergente")
+            continue
+        conn = sqlite3.connect(copy_path)
+        result = conn.execute("PRAGMA integrity_check").fetchone()[0]
+        conn.close()
+        if result != 'ok':
+            errors.append(f"Banco {rel}: {result}")
+    
+    checked = set()
+    for rel, info in manifest['files'].items():
+        if info['sha256'] in checked:
+            continue
+        object_path = _object_path(objects_dir, info['sha256'])
+        if not os.path.exists(object_path) or _sha256_file(object_path) != info['sha256']:
+            errors.append(f"Arquivo {rel}: objeto ausente ou hash divergente")
+        checked.add(info['sha256'])
+    
+    return errors
+
+def restore_backup(snapshot_dir: str, target_dir: str = '.', force: bool = False) -> Dict[str, int]:
+    """Restaura um snapshot verificado (a aplicação deve estar parada)"""
+    errors = verify_backup(snapshot_dir)
+    if errors:
+        raise RuntimeError("Snapshot inválido:\n" + "\n".join(errors))
+    
+    with open(os.path.join(snapshot_dir, 'manifest.json'), encoding='utf-8') as f:
+        manifest = json.load(f)
+    objects_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(snapshot_dir))), 'objects')
+    
+    if not force:
+        existing = [rel for rel in manifest['databases'] if os.path.exists(os.path.join(target_dir, rel))]
+        if existing:
+            raise RuntimeError(f"Bancos já existem no destino ({', '.join(existing)}); use --force para sobrescrever")
+    
+    for rel in manifest['databases']:
+        target = os.path.join(target_dir, rel)
+        Path(target).parent.mkdir(parents=True, exist_ok=True)
+        # WAL/SHM antigos não pertencem ao banco restaurado
+        for suffix in ('-wal', '-shm'):
+            if os.path.exists(target + suffix):
+                os.remove(target + suffix)
+        shutil.copyfile(os.path.join(snapshot_dir, 'db', rel), target)
+    
+    for rel, info in manifest['files'].items():
+        target = os.path.join(target_dir, rel)
+        Path(target).parent.mkdir(parents=True, exist_ok=True)
+        shutil.copyfile(_object_path(objects_dir, info['sha256']), target)
+    
+    return {'databases': len(manifest['databases']), 'files': len(manifest['files'])}
+
+# ============================================================================
+# DOWNLOAD DE ANEXOS (ZIP EM STREAMING E LINKS ASSINADOS)
+# ============================================================================
+
+class _ZipStream(io.RawIOBase):
+    """Destino não-posicionável para o zipfile; os bytes são retirados a cada bloco"""
+    
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+    
+    def writable(self) -> bool:
+        return True
+    
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+    
+    def tell(self) -> int:
+        return self._position
+    
+    def pop(self) -> bytes:
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
+
+def iter_attachments_zip(responses: List[Dict]) -> Iterator[bytes]:
+    """Gera um ZIP com os anexos das respostas, arquivo a arquivo, sem montá-lo em memória"""
+    stream = _ZipStream()
+    with zipfile.ZipFile(stream, 'w') as zf:
+        for response in responses:
+            for filepath in response['files']:
+                if not os.path.exists(stored_upload_path(filepath)):
+                    continue
+                
+                name = os.path.basename(filepath)
+                ext = name.split('.')[-1].lower()
+                info = zipfile.ZipInfo(f"resposta_{response['id']}/{name}",
+                                       date_time=datetime.now().timetuple()[:6])
+                info.compress_type = zipfile.ZIP_STORED if ext in ZIP_STORED_EXTENSIONS else zipfile.ZIP_DEFLATED
+                
+                with open_upload(filepath) as src, zf.open(info, 'w', force_zip64=True) as dst:
+                    for chunk in iter(lambda: src.read(DOWNLOAD_CHUNK_SIZE), b''):
+                        dst.write(chunk)
+                        yield stream.pop()
+                yield stream.pop()
+    # Diretório central
+    yield stream.pop()
+
+def _download_signature(form_id: str, action: str, params: Dict[str, str]) -> str:
+    """Assinatura HMAC de um link de download; muda junto com a senha admin"""
+    key = (get_config('admin_password') or '').encode()
+    message = "|".join([form_id, action] + [f"{k}={params[k]}" for k in sorted(params)])
+    return hmac.new(key, message.encode(), hashlib.sha256).hexdigest()
+
+def build_download_url(form_id: str, action: str, ttl: int = DOWNLOAD_LINK_TTL, **params) -> str:
+    """Monta link assinado e temporário para um download servido pela API"""
+    params = {k: str(v) for k, v in params.items() if v not in (None, '')}
+    params['exp'] = str(int(time.time()) + ttl)
+    params['sig'] = _download_signature(form_id, action, params)
+    return f"{API_PUBLIC_URL}/forms/{form_id}/{action}?{urlencode(params)}"
+
+def verify_download_url(form_id: str, action: str, params: Dict[str, str]) -> bool:
+    """Confere assinatura e validade de um link de download"""
+    params = dict(params)
+    signature = params.pop('sig', '')
+    if not params.get('exp', '').isdigit() or int(params['exp']) < time.time():
+        return False
+    return hmac.compare_digest(signature, _download_signature(form_id, action, params))
+
+# ============================================================================
+# PIPELINE DE SUBMISSÃO (COMPARTILHADO ENTRE FORMULÁRIO E API)
 # ============================================================================
 
-def validate_file(uploaded_file) -> tuple[bool, str]:
-    """Valida arquivo enviado"""
-    if uploaded_file.size > MAX_FILE_SIZE:
-        return False, f"Arquivo muito grande. Máximo: 25MB"
+def validate_submission(form_data: Dict, fields: List[Dict]) -> Optional[str]:
+    """Valida campos obrigatórios e email; retorna mensagem de erro ou None"""
+    errors = []
+    for field in fields:
+        if field['required'] and field['field_type'] != 'file':
+            value = form_data.get(field['name'])
+            if not value or (isinstance(value, str) and not value.strip()):
+                errors.append(f"• {field['label']} é obrigatório")
     
-    ext = uploaded_file.name.split('.')[-1].lower()
-    if ext not in ALLOWED_EXTENSIONS:
-        return False, f"Tipo de arquivo não permitido. Permitidos: {', '.join(ALLOWED_EXTENSIONS)}"
+    if errors:
+        return "Por favor, preencha todos os campos obrigatórios:\n" + "\n".join(errors)
     
-    return True, ""
+    if 'email' in form_data:
+        email = form_data['email']
+        if '@' not in email or '.' not in email:
+            return "Por favor, insira um e-mail válido"
+    
+    return None
 
-def save_uploaded_file(uploaded_file, response_id: int) -> str:
-    """Salva arquivo enviado e retorna o caminho"""
-    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-    filename = f"{response_id}_{timestamp}_{uploaded_file.name}"
-    filepath = os.path.join(UPLOAD_DIR, filename)
+def _unique_upload_name(name: str, used: set) -> str:
+    """Evita que dois anexos com o mesmo nome na submissão gravem no mesmo arquivo"""
+    stem, dot, ext = name.rpartition('.')
+    if not dot:
+        stem, ext = name, ''
+    candidate, n = name, 1
+    while candidate in used:
+        n += 1
+        candidate = f"{stem}_{n}{dot}{ext}"
+    used.add(candidate)
+    return candidate
+
+def process_submission(form_data: Dict, uploaded_files: List,
+                       form_id: str = DEFAULT_FORM_ID) -> Tuple[int, List[str], List[str]]:
+    """Salva resposta e arquivos; retorna (id da resposta, caminhos, avisos)"""
+    # Salvar resposta primeiro para obter ID
+    response_id = save_response(form_data, [], form_id)
     
-    with open(filepath, 'wb') as f:
-        f.write(uploaded_file.getbuffer())
+    file_paths = []
+    hashes = {}
+    warnings = []
+    uploaded_files = list(uploaded_files or [])
+    used = get_upload_usage() if UPLOAD_QUOTA_TOTAL and uploaded_files else 0
+    response_bytes = 0
+    try:
+        if uploaded_files:
+            # Validação, compressão, hash e gravação rodam em paralelo; a submissão
+            # leva o tempo do arquivo mais lento, não a soma de todos
+            with ThreadPoolExecutor(max_workers=min(UPLOAD_WORKERS, len(uploaded_files)),
+                                    thread_name_prefix="upload") as executor:
+                checks = list(executor.map(validate_file, uploaded_files))
+                
+                # Cotas decididas na ordem de envio, pelo tamanho original
+                accepted = []
+                reserved = 0
+                names = set()
+                for uploaded_file, (valid, error_msg) in zip(uploaded_files, checks):
+                    if not valid:
+                        warnings.append(f"Arquivo '{uploaded_file.name}' ignorado: {error_msg}")
+                        continue
+                    if UPLOAD_QUOTA_PER_RESPONSE and reserved + uploaded_file.size > UPLOAD_QUOTA_PER_RESPONSE:
+                        warnings.append(f"Arquivo '{uploaded_file.name}' ignorado: limite de anexos por resposta atingido")
+                        continue
+                    if UPLOAD_QUOTA_TOTAL and used + reserved + uploaded_file.size > UPLOAD_QUOTA_TOTAL:
+                        warnings.append(f"Arquivo '{uploaded_file.name}' ignorado: espaço de armazenamento esgotado")
+                        continue
+                    reserved += uploaded_file.size
+                    accepted.append((uploaded_file, _unique_upload_name(uploaded_file.name, names)))
+                
+                futures = [executor.submit(save_uploaded_file, uploaded_file, response_id, form_id, name)
+                           for uploaded_file, name in accepted]
+                error = None
+                for future in futures:
+                    # Esperar todos terminarem para que o rollback encontre cada arquivo gravado
+                    try:
+                        filepath, digest, stored_bytes = future.result()
+                    except Exception as e:
+                        error = error or e
+                        continue
+                    file_paths.append(filepath)
+                    hashes[os.path.basename(filepath)] = digest
+                    response_bytes += stored_bytes
+                if error:
+                    raise error
+        
+        # Atualizar com caminhos dos arquivos
+        if file_paths:
+            update_response_files(response_id, file_paths, form_id, hashes)
+    except Exception:
+        # Não deixar resposta pela metade nem arquivos órfãos
+        for filepath in file_paths:
+            physical = stored_upload_path(filepath)
+            if os.path.exists(physical):
+                os.remove(physical)
+        delete_response(response_id, form_id)
+        raise
     
-    return filepath
+    if response_bytes:
+        add_upload_usage(response_bytes)
+    
+    enqueue_webhooks(response_id, form_id)
+    
+    return response_id, file_paths, warnings
+
+def notify_new_response(form_data: Dict, fields: List[Dict], file_paths: List[str],
+                        form_id: str = DEFAULT_FORM_ID):
+    """Envia a notificação de nova resposta (ou a acumula no resumo)"""
+    if get_notification_settings(form_id)['mode'] == 'digest':
+        # O envio (que pode ser demorado) fica com o worker, fora da submissão
+        _digest_wakeup.set()
+        return
+    
+    email_body = format_email_body(form_data, fields)
+    subject = "Nova resposta - Ribeiro Forms"
+    if form_id != DEFAULT_FORM_ID:
+        subject += f" [{form_id}]"
+    send_email_with_retry(
+        subject,
+        email_body,
+        file_paths
+    )
 
 # ============================================================================
 # FUNÇÕES DE INTERFACE - FORMULÁRIO PÚBLICO
 # ============================================================================
 
-def render_form():
+def render_form(form_id: str = DEFAULT_FORM_ID):
     """Renderiza o formulário público"""
+    if not form_exists(form_id):
+        st.error("Formulário não encontrado")
+        return
+    
     # Logo/Banner
-    logo_path = get_config('logo_path')
+    logo_path = get_form_config(form_id, 'logo_path')
     if logo_path and os.path.exists(logo_path):
         st.image(logo_path, use_container_width=True)
     
     # Título e descrição
-    title = get_config('title') or '📝 Ribeiro Forms'
-    description = get_config('description') or 'Preencha o formulário abaixo:'
+    title = get_form_config(form_id, 'title') or '📝 Ribeiro Forms'
+    description = get_form_config(form_id, 'description') or 'Preencha o formulário abaixo:'
     
     st.title(title)
     st.markdown(description)
     
     # Buscar campos
-    fields = get_fields()
+    fields = get_fields(form_id)
     
     # Formulário
     with st.form("main_form", clear_on_submit=True):
@@ -424,60 +2001,21 @@ def render_form():
         submitted = st.form_submit_button("📤 Enviar Formulário", use_container_width=True)
         
         if submitted:
-            # Validar campos obrigatórios
-            errors = []
-            for field in fields:
-                if field['required'] and field['field_type'] != 'file':
-                    value = form_data.get(field['name'])
-                    if not value or (isinstance(value, str) and not value.strip()):
-                        errors.append(f"• {field['label']} é obrigatório")
-            
-            if errors:
-                st.error("Por favor, preencha todos os campos obrigatórios:\n" + "\n".join(errors))
+            # Validar campos obrigatórios e email
+            error = validate_submission(form_data, fields)
+            if error:
+                st.error(error)
                 return
             
-            # Validar email
-            if 'email' in form_data:
-                email = form_data['email']
-                if '@' not in email or '.' not in email:
-                    st.error("Por favor, insira um e-mail válido")
-                    return
-            
             # Processar envio
             with st.spinner("Processando seu formulário..."):
                 try:
-                    # Salvar arquivos
-                    file_paths = []
-                    if uploaded_files:
-                        # Salvar resposta primeiro para obter ID
-                        response_id = save_response(form_data, [])
-                        
-                        for uploaded_file in uploaded_files:
-                            valid, error_msg = validate_file(uploaded_file)
-                            if not valid:
-                                st.warning(f"Arquivo '{uploaded_file.name}' ignorado: {error_msg}")
-                                continue
-                            
-                            filepath = save_uploaded_file(uploaded_file, response_id)
-                            file_paths.append(filepath)
-                        
-                        # Atualizar com caminhos dos arquivos
-                        conn = sqlite3.connect(DB_PATH)
-                        c = conn.cursor()
-                        c.execute("UPDATE responses SET files=? WHERE id=?",
-                                (json.dumps(file_paths), response_id))
-                        conn.commit()
-                        conn.close()
-                    else:
-                        response_id = save_response(form_data, [])
+                    response_id, file_paths, warnings = process_submission(form_data, uploaded_files, form_id)
+                    for warning in warnings:
+                        st.warning(warning)
                     
                     # Enviar email
-                    email_body = format_email_body(form_data, fields)
-                    send_email_with_retry(
-                        "Nova resposta - Ribeiro Forms",
-                        email_body,
-                        file_paths
-                    )
+                    notify_new_response(form_data, fields, file_paths, form_id)
                     
                     st.success("✅ Formulário enviado com sucesso!")
                     st.balloons()
@@ -521,19 +2059,60 @@ def admin_panel():
     
     st.markdown("---")
     
+    # Seleção do formulário administrado
+    forms = get_forms()
+    form_ids = [f['id'] for f in forms]
+    form_names = {f['id']: f['name'] for f in forms}
+    if st.session_state.get('admin_form_id') not in form_ids:
+        requested = st.query_params.get('form', DEFAULT_FORM_ID)
+        st.session_state['admin_form_id'] = requested if requested in form_ids else DEFAULT_FORM_ID
+    
+    form_id = st.selectbox("Formulário", form_ids, key='admin_form_id',
+                           format_func=lambda fid: f"{form_names[fid]} ({fid})")
+    
     # Abas
-    tab1, tab2, tab3 = st.tabs(["📝 Configurações", "🎯 Campos", "📊 Respostas"])
+    tab1, tab2, tab3, tab4 = st.tabs(["📝 Configurações", "🎯 Campos", "📊 Respostas", "🗂️ Formulários"])
     
     with tab1:
-        admin_config_tab()
+        admin_config_tab(form_id)
     
     with tab2:
-        admin_fields_tab()
+        admin_fields_tab(form_id)
     
     with tab3:
-        admin_responses_tab()
+        admin_responses_tab(form_id)
+    
+    with tab4:
+        admin_forms_tab(forms)
+
+def admin_forms_tab(forms: List[Dict]):
+    """Aba de gerenciamento de formulários"""
+    st.subheader("Formulários")
+    
+    for form in forms:
+        storage = f"banco próprio `{form['db_path']}`" if form['db_path'] else "banco principal"
+        link = "/" if form['id'] == DEFAULT_FORM_ID else f"/?form={form['id']}"
+        st.write(f"**{form['name']}** — `{form['id']}` — {storage} — link: `{link}`")
+    
+    st.markdown("---")
+    
+    with st.form("add_form"):
+        new_id = st.text_input("Identificador (usado na URL: ?form=identificador)")
+        new_name = st.text_input("Nome da campanha")
+        dedicated = st.checkbox("Banco de dados próprio (recomendado para alto volume)")
+        
+        if st.form_submit_button("Criar Formulário"):
+            if not new_id or not new_name:
+                st.error("Identificador e nome são obrigatórios")
+            else:
+                try:
+                    create_form(new_id.strip(), new_name.strip(), dedicated)
+                    st.success(f"Formulário '{new_name}' criado!")
+                    st.rerun()
+                except ValueError as e:
+                    st.error(str(e))
 
-def admin_config_tab():
+def admin_config_tab(form_id: str):
     """Aba de configurações"""
     st.subheader("Configurações Gerais")
     
@@ -541,17 +2120,17 @@ def admin_config_tab():
     
     with col1:
         title = st.text_input("Título do Formulário", 
-                              value=get_config('title') or 'Ribeiro Forms')
+                              value=get_form_config(form_id, 'title') or 'Ribeiro Forms')
         if st.button("Salvar Título"):
-            set_config('title', title)
+            set_form_config(form_id, 'title', title)
             st.success("Título atualizado!")
     
     with col2:
         description = st.text_area("Descrição", 
-                                   value=get_config('description') or '',
+                                   value=get_form_config(form_id, 'description') or '',
                                    height=100)
         if st.button("Salvar Descrição"):
-            set_config('description', description)
+            set_form_config(form_id, 'description', description)
             st.success("Descrição atualizada!")
     
     st.markdown("---")
@@ -560,22 +2139,98 @@ def admin_config_tab():
     uploaded_logo = st.file_uploader("Upload de Logo (PNG ou JPG)", 
                                      type=['png', 'jpg', 'jpeg'])
     if uploaded_logo:
-        logo_path = os.path.join(LOGO_DIR, f"logo.{uploaded_logo.name.split('.')[-1]}")
+        logo_name = "logo" if form_id == DEFAULT_FORM_ID else f"logo_{form_id}"
+        logo_path = os.path.join(LOGO_DIR, f"{logo_name}.{uploaded_logo.name.split('.')[-1]}")
         with open(logo_path, 'wb') as f:
             f.write(uploaded_logo.getbuffer())
-        set_config('logo_path', logo_path)
+        set_form_config(form_id, 'logo_path', logo_path)
         st.success("Logo atualizado!")
         st.image(logo_path, width=300)
     
-    current_logo = get_config('logo_path')
+    current_logo = get_form_config(form_id, 'logo_path')
     if current_logo and os.path.exists(current_logo):
         st.image(current_logo, caption="Logo atual", width=300)
         if st.button("Remover Logo"):
             os.remove(current_logo)
-            set_config('logo_path', '')
+            set_form_config(form_id, 'logo_path', '')
             st.success("Logo removido!")
             st.rerun()
     
+    st.markdown("---")
+    st.subheader("Notificações por Email")
+    
+    settings = get_notification_settings(form_id)
+    with st.form(f"notifications_{form_id}"):
+        mode = st.radio("Envio", ['immediate', 'digest'],
+                        index=0 if settings['mode'] == 'immediate' else 1,
+                        format_func=lambda m: "Um email por resposta" if m == 'immediate'
+                        else "Resumo periódico (um email com várias respostas)")
+        col1, col2 = st.columns(2)
+        with col1:
+            minutes = st.number_input("Resumo a cada (minutos)", min_value=1, value=settings['minutes'])
+        with col2:
+            count = st.number_input("...ou a cada (respostas)", min_value=1, value=settings['count'])
+        
+        if st.form_submit_button("Salvar Notificações"):
+            set_notification_settings(form_id, mode, minutes, count)
+            st.success("Notificações atualizadas!")
+    
+    if settings['mode'] == 'digest' and st.button("📨 Enviar resumo agora"):
+        try:
+            sent = send_digest(form_id, force=True)
+            st.success(f"Resumo enviado com {sent} resposta(s)" if sent else "Nenhuma resposta pendente")
+        except Exception as e:
+            st.error(f"Erro ao enviar email: {str(e)}")
+    
+    st.markdown("---")
+    st.subheader("Webhooks")
+    
+    for webhook in get_webhooks(form_id):
+        status = f"{webhook['pending']} pendente(s), {webhook['failed']} com falha"
+        with st.expander(f"🔗 {webhook['url']} — {status}"):
+            st.write(f"**Campos enviados:** {', '.join(webhook['fields']) if webhook['fields'] else 'todos'}")
+            st.write("**Segredo (HMAC-SHA256 em X-Ribeiro-Signature):**")
+            st.code(webhook['secret'])
+            col1, col2 = st.columns(2)
+            with col1:
+                if webhook['failed'] and st.button("🔁 Reenviar falhas", key=f"retry_wh_{webhook['id']}"):
+                    retry_failed_webhooks(webhook['id'], form_id)
+                    st.rerun()
+            with col2:
+                if st.button("🗑️ Remover webhook", key=f"del_wh_{webhook['id']}"):
+                    delete_webhook(webhook['id'], form_id)
+                    st.rerun()
+    
+    with st.form(f"add_webhook_{form_id}"):
+        webhook_url = st.text_input("URL do webhook")
+        webhook_secret = st.text_input("Segredo (vazio = gerar automaticamente)", type="password")
+        field_names = [f['name'] for f in get_fields(form_id) if f['field_type'] != 'file']
+        webhook_fields = st.multiselect("Campos enviados (vazio = todos)", field_names)
+        
+        if st.form_submit_button("Adicionar Webhook"):
+            try:
+                add_webhook(form_id, webhook_url.strip(), webhook_secret or None, webhook_fields or None)
+                st.success("Webhook adicionado!")
+                st.rerun()
+            except ValueError as e:
+                st.error(str(e))
+    
+    st.markdown("---")
+    st.subheader("Armazenamento de Arquivos")
+    
+    usage_mb = get_upload_usage() / (1024 * 1024)
+    if UPLOAD_QUOTA_TOTAL:
+        st.write(f"Uso aproximado: **{usage_mb:.1f} MB** de {UPLOAD_QUOTA_TOTAL / (1024 * 1024):.0f} MB")
+    else:
+        st.write(f"Uso aproximado: **{usage_mb:.1f} MB** (sem cota definida)")
+    
+    if st.button("🧹 Remover arquivos órfãos"):
+        stats = collect_upload_garbage()
+        st.success(f"{stats['scanned']} arquivos analisados, {stats['removed']} removidos "
+                   f"({stats['freed'] / (1024 * 1024):.1f} MB liberados)")
+        if stats['cursor']:
+            st.info("Ainda há arquivos a analisar; clique novamente para continuar")
+    
     st.markdown("---")
     st.subheader("Alterar Senha Admin")
     
@@ -591,7 +2246,7 @@ def admin_config_tab():
             else:
                 st.error("As senhas não coincidem ou estão vazias")
 
-def admin_fields_tab():
+def admin_fields_tab(form_id: str):
     """Aba de gerenciamento de campos"""
     st.subheader("Gerenciar Campos")
     
@@ -617,7 +2272,7 @@ def admin_fields_tab():
             if st.form_submit_button("Adicionar Campo"):
                 if field_name and field_label:
                     options = [opt.strip() for opt in options_str.split('\n') if opt.strip()] if options_str else None
-                    add_field(field_name, field_label, field_type, required, options)
+                    add_field(field_name, field_label, field_type, required, options, form_id)
                     st.success(f"Campo '{field_label}' adicionado!")
                     st.rerun()
                 else:
@@ -626,7 +2281,7 @@ def admin_fields_tab():
     st.markdown("---")
     
     # Lista de campos
-    fields = get_fields()
+    fields = get_fields(form_id)
     st.subheader(f"Campos Cadastrados ({len(fields)})")
     
     for i, field in enumerate(fields):
@@ -649,20 +2304,34 @@ def admin_fields_tab():
             with col5:
                 if not field['is_default'] or field['name'] not in ['nome', 'email', 'termos']:
                     if st.button("🗑️", key=f"del_{field['id']}"):
-                        delete_field(field['id'])
+                        delete_field(field['id'], form_id)
                         st.success("Campo removido!")
                         st.rerun()
             
             st.markdown("---")
 
-def admin_responses_tab():
+def admin_responses_tab(form_id: str):
     """Aba de respostas"""
     st.subheader("Respostas Recebidas")
     
-    responses = get_responses()
+    # Filtro (vale para a lista, o CSV e o download de anexos)
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        date_from = st.date_input("De", value=None, key=f"filter_from_{form_id}")
+    with col2:
+        date_to = st.date_input("Até", value=None, key=f"filter_to_{form_id}")
+    with col3:
+        search = st.text_input("Buscar nas respostas", key=f"filter_q_{form_id}")
+    
+    filters = {
+        'from': date_from.isoformat() if date_from else None,
+        'to': date_to.isoformat() if date_to else None,
+        'q': search.strip() or None
+    }
+    responses = get_responses(form_id, filters['from'], filters['to'], filters['q'])
     
     if not responses:
-        st.info("Nenhuma resposta recebida ainda")
+        st.info("Nenhuma resposta encontrada")
         return
     
     st.write(f"**Total de respostas:** {len(responses)}")
@@ -687,20 +2356,32 @@ def admin_responses_tab():
                 filename = f"respostas_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
                 filepath = os.path.join(UPLOAD_DIR, filename)
                 
-                with open(filepath, 'w', encoding='utf-8') as f:
-                    f.write(csv_data)
-                
-                send_email_with_retry(
-                    "Exportação de Respostas - Ribeiro Forms",
-                    f"<p>Segue anexo o arquivo CSV com as respostas recebidas.</p><p>Total: {len(responses)} respostas</p>",
-                    [filepath]
-                )
-                
-                os.remove(filepath)
+                try:
+                    with open(filepath, 'w', encoding='utf-8') as f:
+                        f.write(csv_data)
+                    
+                    send_email_with_retry(
+                        "Exportação de Respostas - Ribeiro Forms",
+                        f"<p>Segue anexo o arquivo CSV com as respostas recebidas.</p><p>Total: {len(responses)} respostas</p>",
+                        [filepath]
+                    )
+                finally:
+                    if os.path.exists(filepath):
+                        os.remove(filepath)
                 st.success("CSV enviado por email!")
             except Exception as e:
                 st.error(f"Erro ao enviar email: {str(e)}")
     
+    # Anexos: o ZIP é gerado em streaming pela API, nunca inteiro em memória
+    if any(response['files'] for response in responses):
+        if API_PUBLIC_URL:
+            st.link_button("📦 Baixar todos os anexos (filtro atual)",
+                           build_download_url(form_id, 'attachments.zip', **filters),
+                           use_container_width=True)
+        else:
+            st.info("Para baixar todos os anexos em ZIP, rode `python app.py api` e defina "
+                    "API_PUBLIC_URL no .env")
+    
     st.markdown("---")
     
     # Listar respostas
@@ -713,8 +2394,36 @@ def admin_responses_tab():
             
             if response['files']:
                 st.write("**Arquivos:**")
-                for file in response['files']:
-                    st.write(f"- {os.path.basename(file)}")
+                if API_PUBLIC_URL:
+                    for file in response['files']:
+                        url = build_download_url(form_id, 'file', response=response['id'],
+                                                 name=os.path.basename(file))
+                        st.markdown(f"- [{os.path.basename(file)}]({url})")
+                    url = build_download_url(form_id, 'attachments.zip', response=response['id'])
+                    st.markdown(f"[📦 Baixar anexos desta resposta (ZIP)]({url})")
+                else:
+                    # Os bytes só são lidos quando o admin pede, não a cada renderização
+                    prepare_key = f"prepare_dl_{form_id}_{response['id']}"
+                    if st.session_state.get(prepare_key):
+                        for i, file in enumerate(response['files']):
+                            if not os.path.exists(stored_upload_path(file)):
+                                st.write(f"- {os.path.basename(file)} (arquivo não encontrado)")
+                                continue
+                            with open_upload(file) as f:
+                                st.download_button(f"⬇️ {os.path.basename(file)}", data=f.read(),
+                                                   file_name=os.path.basename(file),
+                                                   key=f"dl_{form_id}_{response['id']}_{i}")
+                    else:
+                        for file in response['files']:
+                            st.write(f"- {os.path.basename(file)}")
+                        if st.button("⬇️ Preparar downloads", key=f"prepare_{form_id}_{response['id']}"):
+                            st.session_state[prepare_key] = True
+                            st.rerun()
+            
+            if st.button("🗑️ Excluir resposta e arquivos", key=f"del_resp_{response['id']}"):
+                delete_response(response['id'], form_id)
+                st.success("Resposta removida!")
+                st.rerun()
 
 def export_responses_csv(responses: List[Dict]) -> str:
     """Exporta respostas para CSV"""
@@ -746,10 +2455,579 @@ def export_responses_csv(responses: List[Dict]) -> str:
     
     return output.getvalue()
 
+# ============================================================================
+# IMPORTAÇÃO EM LOTE DE RESPOSTAS HISTÓRICAS
+# ============================================================================
+
+IMPORT_CREATED_AT_COLUMNS = {'created_at', 'data/hora', 'data_hora', 'timestamp'}
+IMPORT_IGNORED_COLUMNS = {'id', 'arquivos', 'files'}
+IMPORT_DATE_FORMATS = (
+    '%Y-%m-%d %H:%M:%S', '%Y-%m-%dT%H:%M:%S', '%Y-%m-%dT%H:%M:%S.%f',
+    '%Y-%m-%d %H:%M', '%d/%m/%Y %H:%M:%S', '%d/%m/%Y %H:%M',
+    '%d/%m/%Y', '%Y-%m-%d'
+)
+
+def parse_import_timestamp(value: str, formats: List[str]) -> str:
+    """Normaliza data/hora para o formato do SQLite (AAAA-MM-DD HH:MM:SS)"""
+    value = value.strip()
+    if value.endswith('Z'):
+        value = value[:-1]
+    for i, fmt in enumerate(formats):
+        try:
+            parsed = datetime.strptime(value, fmt)
+        except ValueError:
+            continue
+        # Uma coluna costuma usar um único formato: tentar ele primeiro na próxima linha
+        if i:
+            formats.insert(0, formats.pop(i))
+        return parsed.strftime('%Y-%m-%d %H:%M:%S')
+    raise ValueError(f"data/hora inválida: {value}")
+
+def iter_import_rows(source_path: str, fmt: str, encoding: str = 'utf-8'):
+    """Lê o arquivo em streaming, gerando (linha, registro ou erro)"""
+    with open(source_path, 'r', encoding=encoding, newline='') as f:
+        if fmt == 'csv':
+            reader = csv.DictReader(f)
+            for row in reader:
+                if None in row:
+                    yield reader.line_num, ValueError("colunas a mais na linha")
+                else:
+                    yield reader.line_num, row
+        else:
+            for line_no, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError as e:
+                    yield line_no, ValueError(f"JSON inválido: {e.msg}")
+                    continue
+                if isinstance(record, dict):
+                    yield line_no, record
+                else:
+                    yield line_no, ValueError("a linha não é um objeto JSON")
+
+def resolve_import_column(column: str, fields: List[Dict], column_map: Dict[str, str]) -> Optional[str]:
+    """Mapeia coluna de origem para nome de campo, '__created_at__' ou None"""
+    if column in column_map:
+        return column_map[column]
+    
+    key = column.strip().lower()
+    if key in IMPORT_CREATED_AT_COLUMNS:
+        return '__created_at__'
+    if key in IMPORT_IGNORED_COLUMNS:
+        return None
+    for field in fields:
+        if field['field_type'] != 'file' and key in (field['name'].lower(), field['label'].lower()):
+            return field['name']
+    return None
+
+def import_responses(source_path: str, fmt: str = 'csv', column_map: Optional[Dict[str, str]] = None,
+                     batch_size: int = IMPORT_BATCH_SIZE, rejects_path: Optional[str] = None,
+                     lenient: bool = False, encoding: str = 'utf-8', progress=None,
+                     form_id: str = DEFAULT_FORM_ID) -> Dict[str, Any]:
+    """Importa respostas em lote com executemany e transações grandes"""
+    fields = get_fields(form_id)
+    field_names = {f['name'] for f in fields}
+    column_map = column_map or {}
+    for target in column_map.values():
+        if target != '__created_at__' and target not in field_names:
+            raise ValueError(f"Campo de destino desconhecido: {target}")
+    
+    stats = {'read': 0, 'imported': 0, 'rejected': 0, 'ignored_columns': set()}
+    resolved = {}
+    date_formats = list(IMPORT_DATE_FORMATS)
+    batch = []
+    now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    rejects = open(rejects_path, 'w', encoding='utf-8') if rejects_path else None
+    
+    conn = connect_form_db(form_id)
+    c = conn.cursor()
+    # O índice é reconstruído de uma vez no final, em vez de a cada linha
+    c.execute(f"DROP INDEX IF EXISTS {RESPONSES_CREATED_AT_INDEX}")
+    conn.commit()
+    
+    def reject(line_no, reason, record):
+        stats['rejected'] += 1
+        if rejects:
+            rejects.write(json.dumps({'line': line_no, 'reason': reason, 'row': record},
+                                     ensure_ascii=False, default=str) + '\n')
+    
+    def flush():
+        if batch:
+            c.executemany("INSERT INTO responses (data, files, created_at, form_id, imported) VALUES (?, ?, ?, ?, 1)",
+                          batch)
+            # Na mesma transação o lote tem ids contíguos; se nenhuma resposta aguarda o
+            # resumo antes dele, o cursor do resumo salta o lote inteiro
+            c.execute("SELECT MAX(id) FROM responses")
+            last_id = c.fetchone()[0]
+            c.execute('''UPDATE form_config SET value=? WHERE form_id=? AND key='digest_last_id'
+                         AND CAST(value AS INTEGER)=?''', (str(last_id), form_id, last_id - len(batch)))
+            conn.commit()
+            stats['imported'] += len(batch)
+            batch.clear()
+        if progress:
+            progress(stats)
+    
+    try:
+        for line_no, record in iter_import_rows(source_path, fmt, encoding):
+            stats['read'] += 1
+            if isinstance(record, Exception):
+                reject(line_no, str(record), None)
+                continue
+            
+            raw = {}
+            created_at = now
+            try:
+                for column, value in record.items():
+                    if column not in resolved:
+                        resolved[column] = resolve_import_column(column, fields, column_map)
+                        if resolved[column] is None:
+                            stats['ignored_columns'].add(column)
+                    target = resolved[column]
+                    if target == '__created_at__':
+                        if value not in (None, ''):
+                            created_at = parse_import_timestamp(str(value), date_formats)
+                    elif target:
+                        raw[target] = value
+            except ValueError as e:
+                reject(line_no, str(e), record)
+                continue
+            
+            if not raw:
+                reject(line_no, "nenhuma coluna mapeada para campos do formulário", record)
+                continue
+            
+            form_data, errors = coerce_api_data(raw, fields)
+            error = "; ".join(e.lstrip('• ') for e in errors) if errors else None
+            if not error and not lenient:
+                error = validate_submission(form_data, fields)
+            if error:
+                reject(line_no, error.replace('\n', ' '), record)
+                continue
+            
+            batch.append((encode_response_data(form_data, form_id), json.dumps([]), created_at, form_id))
+            if len(batch) >= batch_size:
+                flush()
+        
+        flush()
+    finally:
+        c.execute(f"CREATE INDEX IF NOT EXISTS {RESPONSES_CREATED_AT_INDEX} ON responses(form_id, created_at)")
+        c.execute("ANALYZE responses")
+        conn.commit()
+        conn.close()
+        if rejects:
+            rejects.close()
+    
+    return stats
+
+# ============================================================================
+# API HTTP (SUBMISSÕES SEM NAVEGADOR)
+# ============================================================================
+
+TRUE_VALUES = {'1', 'true', 'on', 'sim', 'yes', 's', 'y'}
+
+def coerce_api_data(raw: Dict[str, Any], fields: List[Dict]) -> Tuple[Dict, List[str]]:
+    """Converte valores recebidos pela API para o formato gravado pelo formulário"""
+    form_data = {}
+    errors = []
+    
+    for field in fields:
+        name = field['name']
+        field_type = field['field_type']
+        value = raw.get(name)
+        
+        if field_type == 'file':
+            continue
+        
+        if isinstance(value, list) and field_type != 'multiselect':
+            value = value[-1] if value else None
+        
+        try:
+            if field_type in ('text', 'phone', 'email', 'textarea'):
+                form_data[name] = '' if value is None else str(value)
+            
+            elif field_type == 'number':
+                form_data[name] = float(value) if value not in (None, '') else 0.0
+            
+            elif field_type == 'date':
+                if value in (None, ''):
+                    form_data[name] = ''
+                else:
+                    form_data[name] = datetime.strptime(str(value), '%Y-%m-%d').date().isoformat()
+            
+            elif field_type == 'select':
+                if field['options']:
+                    if value in (None, ''):
+                        form_data[name] = ''
+                    elif str(value) in field['options']:
+                        form_data[name] = str(value)
+                    else:
+                        raise ValueError(value)
+            
+            elif field_type == 'multiselect':
+                if field['options']:
+                    if value in (None, ''):
+                        values = []
+                    elif isinstance(value, list):
+                        values = [str(v) for v in value]
+                    else:
+                        values = [v.strip() for v in str(value).split(',') if v.strip()]
+                    if any(v not in field['options'] for v in values):
+                        raise ValueError(value)
+                    form_data[name] = ', '.join(values)
+            
+            elif field_type == 'checkbox':
+                if isinstance(value, bool):
+                    form_data[name] = value
+                else:
+                    form_data[name] = str(value).strip().lower() in TRUE_VALUES if value is not None else False
+        
+        except (TypeError, ValueError):
+            errors.append(f"• {field['label']}: valor inválido")
+    
+    return form_data, errors
+
+def parse_api_request(content_type: str, body: bytes, fields: List[Dict]) -> Tuple[Dict[str, Any], List[SubmittedFile]]:
+    """Extrai valores e arquivos de um corpo JSON, multipart ou urlencoded"""
+    file_field_names = {f['name'] for f in fields if f['field_type'] == 'file'}
+    mime_type = content_type.split(';')[0].strip().lower()
+    raw = {}
+    files = []
+    
+    if mime_type == 'application/json':
+        payload = json.loads(body.decode('utf-8') or '{}')
+        if not isinstance(payload, dict):
+            raise ValueError("O corpo JSON deve ser um objeto")
+        
+        for key, value in payload.items():
+            if key in file_field_names:
+                # Arquivos em JSON: [{"name": "...", "content": "<base64>"}]
+                for item in value or []:
+                    files.append(SubmittedFile(item['name'], base64.b64decode(item['content'])))
+            else:
+                raw[key] = value
+    
+    elif mime_type == 'multipart/form-data':
+        message = BytesParser(policy=policy.HTTP).parsebytes(
+            b'Content-Type: ' + content_type.encode('latin-1') + b'\r\n\r\n' + body
+        )
+        if not message.is_multipart():
+            raise ValueError("Corpo multipart inválido")
+        
+        for part in message.iter_parts():
+            name = part.get_param('name', header='content-disposition')
+            filename = part.get_filename()
+            content = part.get_payload(decode=True) or b''
+            if filename:
+                if content:
+                    files.append(SubmittedFile(filename, content))
+            elif name:
+                raw.setdefault(name, []).append(content.decode('utf-8'))
+    
+    elif mime_type == 'application/x-www-form-urlencoded':
+        raw = parse_qs(body.decode('utf-8'), keep_blank_values=True)
+    
+    else:
+        raise ValueError(f"Content-Type não suportado: {mime_type or 'ausente'}")
+    
+    return raw, files
+
+class FormAPIHandler(BaseHTTPRequestHandler):
+    """Endpoints HTTP que reutilizam o pipeline de submissão do formulário"""
+    
+    server_version = "RibeiroFormsAPI/1.0"
+    protocol_version = "HTTP/1.1"
+    
+    def _send_json(self, status: int, payload: Any):
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        if self.close_connection:
+            self.send_header('Connection', 'close')
+        if API_CORS_ORIGIN:
+            self.send_header('Access-Control-Allow-Origin', API_CORS_ORIGIN)
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def _has_token(self) -> bool:
+        auth = self.headers.get('Authorization', '')
+        token = auth[7:] if auth.startswith('Bearer ') else self.headers.get('X-API-Key', '')
+        return bool(API_TOKEN) and hmac.compare_digest(token.encode(), API_TOKEN.encode())
+    
+    def _authorized(self) -> bool:
+        return not API_TOKEN or self._has_token()
+    
+    def _send_stream(self, chunks: Iterator[bytes], content_type: str, filename: str):
+        """Envia resposta com Transfer-Encoding chunked, sem conhecer o tamanho total"""
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Disposition', f'attachment; filename="{filename.replace(chr(34), "")}"')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        try:
+            for chunk in chunks:
+                if chunk:
+                    self.wfile.write(b"%x\r\n%s\r\n" % (len(chunk), chunk))
+            self.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            self.close_connection = True
+    
+    def _send_downloads(self, form_id: str, action: str):
+        """Anexos de uma resposta ou de um filtro (ZIP) e arquivos individuais"""
+        params = {k: v[0] for k, v in parse_qs(urlparse(self.path).query).items()}
+        params.pop('form', None)
+        if not (self._has_token() or verify_download_url(form_id, action, params)):
+            self._send_json(403, {'error': 'Link inválido ou expirado'})
+            return
+        
+        if params.get('response', '').isdigit():
+            response = get_response(int(params['response']), form_id)
+            responses = [response] if response else []
+        elif 'response' in params:
+            responses = []
+        else:
+            responses = get_responses(form_id, params.get('from'), params.get('to'), params.get('q'))
+        
+        if action == 'attachments.zip':
+            suffix = f"resposta_{params['response']}" if 'response' in params else "anexos"
+            filename = f"{form_id}_{suffix}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.zip"
+            self._send_stream(iter_attachments_zip(responses), 'application/zip', filename)
+            return
+        
+        # action == 'file': um único anexo pelo nome
+        for response in responses:
+            for filepath in response['files']:
+                if os.path.basename(filepath) == params.get('name') and os.path.exists(stored_upload_path(filepath)):
+                    with open_upload(filepath) as f:
+                        self._send_stream(iter(lambda: f.read(DOWNLOAD_CHUNK_SIZE), b''),
+                                          'application/octet-stream', params['name'])
+                    return
+        self._send_json(404, {'error': 'Arquivo não encontrado'})
+    
+    def _route(self) -> Tuple[str, str]:
+        """Extrai (formulário, ação) de /forms/<id>/<ação> ou /<ação>?form=<id>"""
+        url = urlparse(self.path)
+        parts = [p for p in url.path.split('/') if p]
+        if len(parts) == 3 and parts[0] == 'forms':
+            return parts[1], parts[2]
+        form_id = parse_qs(url.query).get('form', [DEFAULT_FORM_ID])[0]
+        return form_id, '/'.join(parts)
+    
+    def do_OPTIONS(self):
+        self.send_response(204)
+        if API_CORS_ORIGIN:
+            self.send_header('Access-Control-Allow-Origin', API_CORS_ORIGIN)
+            self.send_header('Access-Control-Allow-Methods', 'GET, POST, OPTIONS')
+            self.send_header('Access-Control-Allow-Headers', 'Authorization, Content-Type, X-API-Key')
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+    
+    def do_GET(self):
+        form_id, action = self._route()
+        
+        if action == 'health':
+            self._send_json(200, {'status': 'ok'})
+        elif action == 'fields' and form_exists(form_id):
+            fields = [
+                {k: f[k] for k in ('name', 'label', 'field_type', 'required', 'options')}
+                for f in get_fields(form_id)
+            ]
+            self._send_json(200, {'form': form_id, 'fields': fields})
+        elif action in ('attachments.zip', 'file') and form_exists(form_id):
+            self._send_downloads(form_id, action)
+        else:
+            self._send_json(404, {'error': 'Rota não encontrada'})
+    
+    def do_POST(self):
+        form_id, action = self._route()
+        # Respostas antes de ler o corpo encerram a conexão: o corpo não lido seria
+        # interpretado como a próxima requisição
+        if action != 'submit' or not form_exists(form_id):
+            self.close_connection = True
+            self._send_json(404, {'error': 'Rota não encontrada'})
+            return
+        
+        if not self._authorized():
+            self.close_connection = True
+            self._send_json(401, {'error': 'Não autorizado'})
+            return
+        
+        # Sem um tamanho confiável não dá para delimitar o corpo
+        raw_length = self.headers.get('Content-Length')
+        if raw_length is None:
+            self.close_connection = True
+            self._send_json(411, {'error': 'Content-Length obrigatório'})
+            return
+        try:
+            length = int(raw_length)
+        except ValueError:
+            length = -1
+        if length < 0:
+            self.close_connection = True
+            self._send_json(400, {'error': 'Content-Length inválido'})
+            return
+        if length > API_MAX_BODY_SIZE:
+            self.close_connection = True
+            self._send_json(413, {'error': 'Requisição muito grande'})
+            return
+        body = self.rfile.read(length)
+        
+        fields = get_fields(form_id)
+        try:
+            raw, uploaded_files = parse_api_request(self.headers.get('Content-Type', ''), body, fields)
+        except (ValueError, KeyError, TypeError, UnicodeDecodeError) as e:
+            self._send_json(400, {'error': f"Requisição inválida: {e}"})
+            return
+        
+        form_data, errors = coerce_api_data(raw, fields)
+        if errors:
+            self._send_json(400, {'error': "Valores inválidos:\n" + "\n".join(errors)})
+            return
+        
+        error = validate_submission(form_data, fields)
+        if error:
+            self._send_json(400, {'error': error})
+            return
+        
+        try:
+            response_id, file_paths, warnings = process_submission(form_data, uploaded_files, form_id)
+        except Exception as e:
+            self._send_json(500, {'error': f"Erro ao processar formulário: {str(e)}"})
+            return
+        
+        # Notificação fora do ciclo da requisição, em fila persistente
+        enqueue_notification(response_id, form_id)
+        
+        self._send_json(201, {
+            'id': response_id,
+            'files': [os.path.basename(p) for p in file_paths],
+            'warnings': warnings
+        })
+
+_notify_wakeup = threading.Event()
+
+def enqueue_notification(response_id: int, form_id: str = DEFAULT_FORM_ID):
+    """Registra a notificação da resposta na fila do banco (sobrevive a reinícios)"""
+    conn = connect_form_db(form_id)
+    conn.execute("INSERT INTO notification_outbox (form_id, response_id, next_attempt_at) VALUES (?, ?, ?)",
+                 (form_id, response_id, time.time()))
+    conn.commit()
+    conn.close()
+    _notify_wakeup.set()
+
+def _deliver_notification(db_path: str, outbox_id: int, form_id: str, response_id: int, attempts: int):
+    """Envia uma notificação da fila e a remove (ou reagenda em caso de falha)"""
+    error = None
+    response = get_response(response_id, form_id)
+    if response:
+        try:
+            notify_new_response(response['data'], get_fields(form_id), response['files'], form_id)
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+    
+    conn = sqlite3.connect(db_path)
+    if error is None:
+        conn.execute("DELETE FROM notification_outbox WHERE id=?", (outbox_id,))
+    else:
+        attempts += 1
+        if attempts >= API_NOTIFY_MAX_ATTEMPTS:
+            conn.execute("UPDATE notification_outbox SET status=?, attempts=?, last_error=? WHERE id=?",
+                         ('failed', attempts, error, outbox_id))
+        else:
+            delay = min(API_NOTIFY_MAX_BACKOFF, 60 * 2 ** attempts) + random.uniform(0, 1)
+            conn.execute('''UPDATE notification_outbox SET attempts=?, next_attempt_at=?, last_error=?, claimed_by=NULL
+                            WHERE id=?''', (attempts, time.time() + delay, error, outbox_id))
+        logger.warning("Falha ao notificar resposta %s do formulário %s: %s", response_id, form_id, error)
+    conn.commit()
+    conn.close()
+
+def dispatch_notifications_once(executor: ThreadPoolExecutor) -> int:
+    """Reivindica até API_NOTIFY_WORKERS notificações vencidas por banco e as envia; retorna quantas"""
+    claimed_total = 0
+    db_paths = sorted({get_form_db_path(f['id']) for f in get_forms()})
+    
+    for db_path in db_paths:
+        token = secrets.token_hex(8)
+        now = time.time()
+        conn = sqlite3.connect(db_path)
+        c = conn.cursor()
+        # Só o que os workers dão conta de enviar sai do banco; o resto espera na fila
+        c.execute('''UPDATE notification_outbox SET claimed_by=?, next_attempt_at=?
+                     WHERE id IN (SELECT id FROM notification_outbox
+                                  WHERE status='pending' AND next_attempt_at <= ?
+                                  ORDER BY id LIMIT ?)''',
+                  (token, now + API_NOTIFY_LEASE, now, API_NOTIFY_WORKERS))
+        conn.commit()
+        c.execute("SELECT id, form_id, response_id, attempts FROM notification_outbox WHERE claimed_by=? ORDER BY id",
+                  (token,))
+        rows = c.fetchall()
+        conn.close()
+        claimed_total += len(rows)
+        
+        futures = [executor.submit(_deliver_notification, db_path, *row) for row in rows]
+        for future in futures:
+            try:
+                future.result()
+            except Exception:
+                logger.exception("Erro ao processar notificação pendente")
+    
+    return claimed_total
+
+def start_notification_dispatcher() -> threading.Thread:
+    """Thread que envia as notificações da fila com um pool limitado de conexões SMTP"""
+    executor = ThreadPoolExecutor(max_workers=API_NOTIFY_WORKERS, thread_name_prefix="notify")
+    
+    def loop():
+        while True:
+            try:
+                claimed = dispatch_notifications_once(executor)
+            except Exception:
+                logger.exception("Erro no envio de notificações pendentes")
+                claimed = 0
+            if not claimed:
+                _notify_wakeup.wait(API_NOTIFY_POLL_INTERVAL)
+                _notify_wakeup.clear()
+    
+    worker = threading.Thread(target=loop, name="notification-dispatcher", daemon=True)
+    worker.start()
+    return worker
+
+def run_api_server(host: str = API_HOST, port: int = API_PORT):
+    """Inicia o servidor HTTP da API de submissões"""
+    init_db()
+    server = ThreadingHTTPServer((host, port), FormAPIHandler)
+    server.daemon_threads = True
+    start_notification_dispatcher()
+    start_digest_worker()
+    start_webhook_dispatcher()
+    logger.info("API de submissões em http://%s:%s", host, port)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
 # ============================================================================
 # APLICAÇÃO PRINCIPAL
 # ============================================================================
 
+@st.cache_resource
+def _shared_wakeup_events():
+    """Eventos de despertar dos workers, os mesmos em todos os reruns
+    
+    Cada rerun do Streamlit executa o script num módulo novo; sem isso, o evento
+    acionado por uma submissão não seria o mesmo que o worker aguarda.
+    """
+    return _webhook_wakeup, _digest_wakeup
+
+@st.cache_resource
+def _background_workers():
+    """Inicia uma única vez por processo as threads de segundo plano"""
+    return start_digest_worker(), start_webhook_dispatcher()
+
 def main():
     """Função principal da aplicação"""
     
@@ -763,6 +3041,9 @@ def main():
     
     # Inicializar banco de dados
     init_db()
+    global _webhook_wakeup, _digest_wakeup
+    _webhook_wakeup, _digest_wakeup = _shared_wakeup_events()
+    _background_workers()
     
     # Inicializar session state
     if 'admin_logged_in' not in st.session_state:
@@ -850,7 +3131,7 @@ def main():
         admin_panel()
     
     else:
-        render_form()
+        render_form(st.query_params.get('form', DEFAULT_FORM_ID))
         
         # Rodapé
         st.markdown(
@@ -862,8 +3143,227 @@ def main():
             unsafe_allow_html=True
         )
 
+# ============================================================================
+# LINHA DE COMANDO
+# ============================================================================
+
+def cmd_api(args):
+    """Comando: servidor HTTP de submissões"""
+    run_api_server(args.host, args.port)
+
+def cmd_import(args):
+    """Comando: importação em lote de respostas"""
+    column_map = {}
+    for item in args.map or []:
+        column, sep, field_name = item.partition('=')
+        if not sep:
+            raise SystemExit(f"Mapeamento inválido (use coluna=campo): {item}")
+        column_map[column] = field_name
+    
+    init_db()
+    if not form_exists(args.form):
+        raise SystemExit(f"Formulário não encontrado: {args.form}")
+    fmt = args.format or ('ndjson' if args.source.lower().endswith(('.ndjson', '.jsonl')) else 'csv')
+    started = time.time()
+    
+    def progress(stats):
+        print(f"\r{stats['read']} lidas | {stats['imported']} importadas | "
+              f"{stats['rejected']} rejeitadas | {time.time() - started:.0f}s",
+              end='', file=sys.stderr, flush=True)
+    
+    stats = import_responses(args.source, fmt, column_map, args.batch_size,
+                             args.rejects, args.lenient, args.encoding, progress, args.form)
+    print(file=sys.stderr)
+    if stats['ignored_columns']:
+        print(f"Colunas ignoradas: {', '.join(sorted(stats['ignored_columns']))}", file=sys.stderr)
+    if stats['rejected'] and args.rejects:
+        print(f"Linhas rejeitadas gravadas em {args.rejects}", file=sys.stderr)
+
+def cmd_gc(args):
+    """Comando: coleta de lixo de uploads"""
+    init_db()
+    totals = {'scanned': 0, 'removed': 0, 'freed': 0}
+    cursor = json.loads(get_config('gc_cursor') or '{}') if args.dry_run else None
+    
+    while True:
+        stats = collect_upload_garbage(args.batch_size, args.min_age, args.dry_run, cursor)
+        for key in totals:
+            totals[key] += stats[key]
+        cursor = stats['cursor']
+        if not cursor or not args.all:
+            break
+        # Pausa entre lotes para não competir com as submissões
+        time.sleep(args.sleep)
+    
+    action = "seriam removidos" if args.dry_run else "removidos"
+    print(f"{totals['scanned']} arquivos analisados, {totals['removed']} {action} "
+          f"({totals['freed'] / (1024 * 1024):.1f} MB)", file=sys.stderr)
+    if cursor:
+        print("Ciclo incompleto; execute novamente para continuar", file=sys.stderr)
+    else:
+        print(f"Uso total de uploads: {stats['usage'] / (1024 * 1024):.1f} MB", file=sys.stderr)
+
+def cmd_backup(args):
+    """Comando: backup online dos bancos e uploads"""
+    init_db()
+    snapshot_dir, stats = create_backup(args.dest, args.pages, args.sleep)
+    print(f"Snapshot criado em {snapshot_dir}: {stats['databases']} banco(s), {stats['files']} arquivo(s), "
+          f"{stats['new_objects']} novo(s) ({stats['new_bytes'] / (1024 * 1024):.1f} MB copiados)",
+          file=sys.stderr)
+
+def cmd_restore(args):
+    """Comando: verificação e restauração de snapshot"""
+    if args.verify_only:
+        errors = verify_backup(args.snapshot)
+        for error in errors:
+            print(error, file=sys.stderr)
+        if errors:
+            raise SystemExit(1)
+        print("Snapshot íntegro", file=sys.stderr)
+        return
+    
+    try:
+        stats = restore_backup(args.snapshot, args.target, args.force)
+    except RuntimeError as e:
+        raise SystemExit(str(e))
+    print(f"Restaurados {stats['databases']} banco(s) e {stats['files']} arquivo(s) em {args.target}",
+          file=sys.stderr)
+
+def cmd_digest(args):
+    """Comando: envio de resumos de notificação (para uso com cron)"""
+    init_db()
+    if args.form:
+        if not form_exists(args.form):
+            raise SystemExit(f"Formulário não encontrado: {args.form}")
+        sent = send_digest(args.form, force=args.force)
+    else:
+        sent = send_due_digests()
+    print(f"{sent} resposta(s) enviada(s) em resumo", file=sys.stderr)
+
+def cmd_webhooks(args):
+    """Comando: entrega de webhooks pendentes"""
+    init_db()
+    if args.once:
+        with ThreadPoolExecutor(max_workers=WEBHOOK_WORKERS, thread_name_prefix="webhook") as executor:
+            claimed = dispatch_webhooks_once(executor)
+        print(f"{claimed} entrega(s) processada(s)", file=sys.stderr)
+        return
+    
+    start_webhook_dispatcher()
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+
+def cmd_migrate_responses(args):
+    """Comando: converte responses.data de respostas existentes (json <-> compact)"""
+    init_db()
+    if args.form and not form_exists(args.form):
+        raise SystemExit(f"Formulário não encontrado: {args.form}")
+    form_ids = [args.form] if args.form else [f['id'] for f in get_forms()]
+    
+    for form_id in form_ids:
+        if args.train_dict and args.to == 'compact':
+            dict_id = train_response_dict(form_id)
+            if dict_id:
+                print(f"[{form_id}] dicionário {dict_id} treinado", file=sys.stderr)
+        
+        def progress(stats):
+            print(f"\r[{form_id}] {stats['rows']} resposta(s) lidas, {stats['changed']} convertida(s)",
+                  end="", file=sys.stderr)
+        
+        stats = migrate_response_data(form_id, args.to, args.batch_size, progress)
+        if stats['rows']:
+            print(file=sys.stderr)
+        print(f"[{form_id}] {stats['bytes_before'] / 1024:.0f} KB -> {stats['bytes_after'] / 1024:.0f} KB",
+              file=sys.stderr)
+    
+    if args.vacuum:
+        # Devolve ao sistema o espaço liberado (bloqueia o banco durante a operação)
+        for db_path in sorted({get_form_db_path(form_id) for form_id in form_ids}):
+            conn = sqlite3.connect(db_path)
+            conn.execute("VACUUM")
+            conn.close()
+
+def run_cli(argv: Optional[List[str]] = None):
+    """Ponto de entrada para `python app.py <comando>`"""
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    
+    parser = argparse.ArgumentParser(prog="app.py", description="Ribeiro Forms - comandos administrativos")
+    subparsers = parser.add_subparsers(dest="command")
+    
+    p_api = subparsers.add_parser("api", help="Servidor HTTP para submissões JSON/multipart")
+    p_api.add_argument("--host", default=API_HOST)
+    p_api.add_argument("--port", type=int, default=API_PORT)
+    p_api.set_defaults(func=cmd_api)
+    
+    p_import = subparsers.add_parser("import", help="Importa respostas históricas de CSV ou NDJSON")
+    p_import.add_argument("source", help="Arquivo .csv ou .ndjson")
+    p_import.add_argument("--format", choices=["csv", "ndjson"], help="Padrão: pela extensão do arquivo")
+    p_import.add_argument("--map", action="append", metavar="COLUNA=CAMPO",
+                          help="Mapeia coluna de origem para campo (use __created_at__ para a data)")
+    p_import.add_argument("--batch-size", type=int, default=IMPORT_BATCH_SIZE)
+    p_import.add_argument("--rejects", help="Grava linhas rejeitadas (NDJSON) neste arquivo")
+    p_import.add_argument("--lenient", action="store_true",
+                          help="Não exige campos obrigatórios nem valida o email")
+    p_import.add_argument("--encoding", default="utf-8")
+    p_import.add_argument("--form", default=DEFAULT_FORM_ID, help="Identificador do formulário de destino")
+    p_import.set_defaults(func=cmd_import)
+    
+    p_gc = subparsers.add_parser("gc", help="Remove uploads órfãos e recalcula o uso de disco")
+    p_gc.add_argument("--batch-size", type=int, default=GC_BATCH_SIZE, help="Arquivos analisados por lote")
+    p_gc.add_argument("--min-age", type=int, default=GC_MIN_AGE,
+                      help="Ignora arquivos mais novos que N segundos")
+    p_gc.add_argument("--all", action="store_true", help="Processa lotes até completar o ciclo")
+    p_gc.add_argument("--sleep", type=float, default=0.5, help="Pausa entre lotes com --all")
+    p_gc.add_argument("--dry-run", action="store_true", help="Apenas lista o que seria removido")
+    p_gc.set_defaults(func=cmd_gc)
+    
+    p_backup = subparsers.add_parser("backup", help="Backup online dos bancos e snapshot incremental dos uploads")
+    p_backup.add_argument("dest", help="Diretório de backups")
+    p_backup.add_argument("--pages", type=int, default=BACKUP_PAGES_PER_STEP,
+                          help="Páginas por passo (padrão: tudo de uma vez; passos pequenos recomeçam a cada escrita)")
+    p_backup.add_argument("--sleep", type=float, default=BACKUP_STEP_SLEEP, help="Pausa entre passos com --pages (s)")
+    p_backup.set_defaults(func=cmd_backup)
+    
+    p_restore = subparsers.add_parser("restore", help="Verifica e restaura um snapshot")
+    p_restore.add_argument("snapshot", help="Diretório do snapshot (backups/snapshots/AAAAMMDD_HHMMSS)")
+    p_restore.add_argument("--target", default=".", help="Diretório de destino")
+    p_restore.add_argument("--force", action="store_true", help="Sobrescreve bancos existentes")
+    p_restore.add_argument("--verify-only", action="store_true", help="Apenas verifica o snapshot")
+    p_restore.set_defaults(func=cmd_restore)
+    
+    p_digest = subparsers.add_parser("digest", help="Envia os resumos de notificação vencidos")
+    p_digest.add_argument("--form", help="Apenas este formulário")
+    p_digest.add_argument("--force", action="store_true", help="Envia as respostas pendentes mesmo antes do prazo")
+    p_digest.set_defaults(func=cmd_digest)
+    
+    p_webhooks = subparsers.add_parser("webhooks", help="Entrega webhooks pendentes (o Streamlit e a API já fazem isso)")
+    p_webhooks.add_argument("--once", action="store_true", help="Processa uma rodada e sai")
+    p_webhooks.set_defaults(func=cmd_webhooks)
+    
+    p_migrate = subparsers.add_parser("migrate-responses", help="Converte o formato de armazenamento das respostas")
+    p_migrate.add_argument("--to", choices=["compact", "json"], default="compact")
+    p_migrate.add_argument("--form", help="Apenas este formulário")
+    p_migrate.add_argument("--train-dict", action="store_true",
+                           help="Treina antes um dicionário zlib com as respostas existentes")
+    p_migrate.add_argument("--batch-size", type=int, default=IMPORT_BATCH_SIZE)
+    p_migrate.add_argument("--vacuum", action="store_true", help="Compacta o arquivo do banco ao final")
+    p_migrate.set_defaults(func=cmd_migrate_responses)
+    
+    args = parser.parse_args(argv)
+    if not hasattr(args, 'func'):
+        parser.print_help()
+        return
+    args.func(args)
+
 if __name__ == "__main__":
-    main()
+    # `streamlit run app.py` abre a interface; `python app.py <comando>` usa a CLI
+    if st_runtime.exists():
+        main()
+    else:
+        run_cli()
 
 st.markdown("""
 <style>
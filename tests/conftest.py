@@ -0,0 +1,24 @@
+import importlib
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    """Módulo app.py rodando num diretório temporário, com bancos e caches zerados"""
+    monkeypatch.chdir(tmp_path)
+    module = importlib.import_module('app')
+    for directory in (module.UPLOAD_DIR, module.LOGO_DIR, module.FORM_DB_DIR):
+        Path(directory).mkdir(exist_ok=True)
+    for cache in (module._form_db_paths, module._response_keys,
+                  module._response_zdicts, module._response_latest_zdict):
+        cache.clear()
+    module._gc_listings.update(cycle=None, dirs={})
+    module.init_db()
+    return module
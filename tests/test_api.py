@@ -0,0 +1,168 @@
+import base64
+import http.client
+import json
+import socket
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from http.server import ThreadingHTTPServer
+from urllib.parse import urlencode
+
+import pytest
+
+
+@pytest.fixture
+def api(app):
+    server = ThreadingHTTPServer(('127.0.0.1', 0), app.FormAPIHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server.server_address
+    server.shutdown()
+    server.server_close()
+
+
+def post(api, body, content_type='application/json', path='/submit', headers=None):
+    connection = http.client.HTTPConnection(*api, timeout=5)
+    connection.request('POST', path, body=body, headers={'Content-Type': content_type, **(headers or {})})
+    response = connection.getresponse()
+    payload = json.loads(response.read())
+    connection.close()
+    return response.status, payload
+
+
+def outbox(app):
+    conn = sqlite3.connect(app.DB_PATH)
+    rows = conn.execute("SELECT response_id, status, attempts, claimed_by FROM notification_outbox").fetchall()
+    conn.close()
+    return rows
+
+
+VALID = {'nome': 'Ana', 'email': 'ana@exemplo.com', 'termos': True}
+
+
+def test_json_submission_with_files(app, api):
+    files = [{'name': 'cv.txt', 'content': base64.b64encode(b'curriculo').decode()}]
+    status, payload = post(api, json.dumps({**VALID, 'anexos': files}))
+
+    assert status == 201
+    assert payload['warnings'] == []
+    [name] = payload['files']
+    assert name.endswith('_cv.txt')
+    response = app.get_response(payload['id'])
+    assert response['data']['nome'] == 'Ana' and response['data']['termos'] is True
+    with app.open_upload(response['files'][0]) as f:
+        assert f.read() == b'curriculo'
+    assert outbox(app) == [(payload['id'], 'pending', 0, None)]
+
+
+def test_multipart_submission(app, api):
+    boundary = 'limite'
+    parts = [f'--{boundary}\r\nContent-Disposition: form-data; name="{k}"\r\n\r\n{v}\r\n'
+             for k, v in [('nome', 'Bruno'), ('email', 'bruno@exemplo.com'), ('termos', 'on')]]
+    parts.append(f'--{boundary}\r\nContent-Disposition: form-data; name="anexos"; filename="nota.txt"\r\n'
+                 f'Content-Type: text/plain\r\n\r\nconteudo\r\n--{boundary}--\r\n')
+    status, payload = post(api, ''.join(parts).encode(), f'multipart/form-data; boundary={boundary}')
+
+    assert status == 201
+    response = app.get_response(payload['id'])
+    assert response['data']['nome'] == 'Bruno' and response['data']['termos'] is True
+    with app.open_upload(response['files'][0]) as f:
+        assert f.read() == b'conteudo'
+
+
+def test_urlencoded_submission(app, api):
+    body = urlencode({'nome': 'Carla', 'email': 'carla@exemplo.com', 'termos': 'sim', 'mensagem': 'olá'})
+    status, payload = post(api, body, 'application/x-www-form-urlencoded')
+
+    assert status == 201
+    data = app.get_response(payload['id'])['data']
+    assert (data['nome'], data['mensagem'], data['termos']) == ('Carla', 'olá', True)
+
+
+@pytest.mark.parametrize('body, content_type', [
+    ('[1, 2]', 'application/json'),
+    ('{"nome": ', 'application/json'),
+    ('nome=Ana', 'text/plain'),
+    (json.dumps({'nome': 'Ana', 'termos': True}), 'application/json'),
+    (json.dumps({**VALID, 'email': 'invalido'}), 'application/json'),
+])
+def test_invalid_submission_is_rejected(app, api, body, content_type):
+    status, payload = post(api, body, content_type)
+
+    assert status == 400
+    assert payload['error']
+    assert app.get_responses(app.DEFAULT_FORM_ID) == []
+    assert outbox(app) == []
+
+
+def raw_post(api, headers):
+    """Envia cabeçalhos crus e retorna a linha de status e a resposta completa"""
+    with socket.create_connection(api, timeout=5) as sock:
+        sock.sendall(b'POST /submit HTTP/1.1\r\nHost: x\r\nContent-Type: application/json\r\n'
+                     + headers + b'\r\n')
+        received = b''
+        while chunk := sock.recv(65536):
+            received += chunk
+    return received.split(b'\r\n', 1)[0], received
+
+
+@pytest.mark.parametrize('headers, expected', [
+    (b'', b'411'),
+    (b'Content-Length: abc\r\n', b'400'),
+    (b'Content-Length: -5\r\n', b'400'),
+    (b'Content-Length: 1025\r\n', b'413'),
+])
+def test_body_size_is_checked_before_reading(app, api, monkeypatch, headers, expected):
+    monkeypatch.setattr(app, 'API_MAX_BODY_SIZE', 1024)
+    # Nenhum corpo é enviado: a resposta vem sem esperar por ele e encerra a conexão
+    status_line, received = raw_post(api, headers)
+
+    assert status_line.split()[1] == expected
+    assert b'Connection: close' in received
+
+
+def test_notification_outbox_retries_failures(app, api, monkeypatch):
+    sent = []
+
+    def flaky_send(subject, body, attachments, max_retries=3):
+        if not sent:
+            sent.append(None)
+            raise ConnectionError('SMTP indisponível')
+        sent.append(subject)
+
+    monkeypatch.setattr(app, 'send_email_with_retry', flaky_send)
+    status, payload = post(api, json.dumps(VALID))
+    assert status == 201
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        assert app.dispatch_notifications_once(executor) == 1
+        [(response_id, state, attempts, claimed_by)] = outbox(app)
+        assert (response_id, state, attempts, claimed_by) == (payload['id'], 'pending', 1, None)
+
+        # Ainda dentro do backoff
+        assert app.dispatch_notifications_once(executor) == 0
+
+        conn = sqlite3.connect(app.DB_PATH)
+        conn.execute("UPDATE notification_outbox SET next_attempt_at=0")
+        conn.commit()
+        conn.close()
+        assert app.dispatch_notifications_once(executor) == 1
+
+    assert sent == [None, 'Nova resposta - Ribeiro Forms']
+    assert outbox(app) == []
+
+
+def test_rejected_post_closes_connection(app, api, monkeypatch):
+    monkeypatch.setattr(app, 'API_TOKEN', 'segredo')
+    # O corpo não lido não pode ser interpretado como a próxima requisição
+    smuggled = b'GET /health HTTP/1.1\r\nHost: x\r\n\r\n'
+    for request_line, expected in [(b'POST /submit', b'401'), (b'POST /nada', b'404')]:
+        with socket.create_connection(api, timeout=5) as sock:
+            sock.sendall(request_line + b' HTTP/1.1\r\nHost: x\r\nAuthorization: Bearer errado\r\n'
+                         b'Content-Length: %d\r\n\r\n' % len(smuggled) + smuggled)
+            received = b''
+            while chunk := sock.recv(65536):
+                received += chunk
+        assert received.startswith(b'HTTP/1.1 ' + expected)
+        assert b'Connection: close' in received
+        assert received.count(b'HTTP/1.1 ') == 1
@@ -0,0 +1,46 @@
+import io
+import os
+import zipfile
+
+
+def submit_with_files(app, files):
+    uploads = [app.SubmittedFile(name, content) for name, content in files]
+    response_id, file_paths, warnings = app.process_submission({'nome': 'Ana'}, uploads)
+    assert warnings == []
+    return app.get_response(response_id)
+
+
+def test_zip_round_trip(app, monkeypatch):
+    monkeypatch.setattr(app, 'DOWNLOAD_CHUNK_SIZE', 64 * 1024)
+    text = b'linha de texto repetida\n' * 20000  # gravado comprimido (.gz) em disco
+    image = b'\x89PNG\r\n\x1a\n' + os.urandom(300 * 1024)
+    first = submit_with_files(app, [('notas.txt', text), ('foto.png', image)])
+    second = submit_with_files(app, [('contrato.pdf', b'%PDF-1.4 conteudo')])
+    assert os.path.exists(first['files'][0] + app.COMPRESSED_SUFFIX)
+
+    chunks = list(app.iter_attachments_zip([first, second]))
+    assert len(chunks) > 3
+    assert max(len(chunk) for chunk in chunks) < 2 * app.DOWNLOAD_CHUNK_SIZE
+
+    with zipfile.ZipFile(io.BytesIO(b''.join(chunks))) as zf:
+        assert zf.testzip() is None
+        entries = {info.filename: info for info in zf.infolist()}
+        by_name = {os.path.basename(name).split('_', 3)[-1]: name for name in entries}
+        assert set(by_name) == {'notas.txt', 'foto.png', 'contrato.pdf'}
+        assert by_name['notas.txt'].startswith(f"resposta_{first['id']}/")
+        assert by_name['contrato.pdf'].startswith(f"resposta_{second['id']}/")
+
+        # Conteúdo original, mesmo quando o upload está comprimido em disco
+        assert zf.read(by_name['notas.txt']) == text
+        assert zf.read(by_name['foto.png']) == image
+        assert entries[by_name['notas.txt']].compress_type == zipfile.ZIP_DEFLATED
+        assert entries[by_name['foto.png']].compress_type == zipfile.ZIP_STORED
+
+
+def test_zip_skips_missing_files(app):
+    response = submit_with_files(app, [('a.txt', b'primeiro'), ('b.txt', b'segundo')])
+    os.remove(app.stored_upload_path(response['files'][0]))
+
+    with zipfile.ZipFile(io.BytesIO(b''.join(app.iter_attachments_zip([response])))) as zf:
+        assert [name.rsplit('_', 1)[-1] for name in zf.namelist()] == ['b.txt']
+        assert zf.read(zf.namelist()[0]) == b'segundo'
@@ -0,0 +1,46 @@
+import sqlite3
+
+
+def columns(db_path, table):
+    conn = sqlite3.connect(db_path)
+    names = [row[1] for row in conn.execute(f"PRAGMA table_info({table})")]
+    conn.close()
+    return names
+
+
+def test_init_db_migrates_existing_shards(app):
+    app.create_form('camp', 'Campanha', dedicated_db=True)
+    shard = app.get_form_db_path('camp')
+    assert shard != app.DB_PATH
+
+    # Simula um shard criado por uma versão anterior
+    conn = sqlite3.connect(shard)
+    conn.execute("DROP TABLE webhooks")
+    conn.execute("DROP TABLE response_keys")
+    conn.execute("ALTER TABLE responses DROP COLUMN imported")
+    conn.execute("ALTER TABLE responses DROP COLUMN file_hashes")
+    conn.commit()
+    conn.close()
+
+    app.init_db()
+
+    assert {'imported', 'file_hashes'} <= set(columns(shard, 'responses'))
+    assert columns(shard, 'webhooks') and columns(shard, 'response_keys')
+    conn = sqlite3.connect(shard)
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == 'wal'
+    conn.close()
+
+    response_id, _, _ = app.process_submission({'nome': 'Ana'}, [], 'camp')
+    assert app.get_response(response_id, 'camp')['data'] == {'nome': 'Ana'}
+    app.set_notification_settings('camp', 'digest', 60, 100)
+    assert app.send_digest('camp') == 0
+
+
+def test_init_db_skips_missing_shard_file(app, tmp_path):
+    app.create_form('camp', 'Campanha', dedicated_db=True)
+    shard = tmp_path / app.get_form_db_path('camp')
+    shard.unlink()
+
+    app.init_db()
+
+    assert not shard.exists()
@@ -0,0 +1,100 @@
+import json
+import os
+import time
+
+
+def age(path, seconds):
+    past = time.time() - seconds
+    os.utime(path, (past, past))
+
+
+def upload(app, name, content=b'conteudo'):
+    path = os.path.join(app.UPLOAD_DIR, name)
+    with open(path, 'wb') as f:
+        f.write(content)
+    age(path, 2 * app.GC_MIN_AGE)
+    return path
+
+
+def submit(app, files):
+    uploads = [app.SubmittedFile(name, content) for name, content in files]
+    response_id, file_paths, _ = app.process_submission({'nome': 'Ana'}, uploads)
+    for path in file_paths:
+        age(app.stored_upload_path(path), 2 * app.GC_MIN_AGE)
+    return [app.stored_upload_path(path) for path in file_paths]
+
+
+def test_orphans_are_removed_and_usage_recounted(app):
+    kept = submit(app, [('foto.png', b'\x89PNG\r\n\x1a\n' + b'x' * 100)])
+    orphans = [upload(app, '999_20250101_000000_perdido.pdf', b'y' * 50), upload(app, 'sem_prefixo.txt')]
+    app.add_upload_usage(10 ** 6)
+
+    stats = app.collect_upload_garbage()
+
+    assert (stats['scanned'], stats['removed'], stats['freed']) == (3, 2, 58)
+    assert stats['cursor'] is None
+    assert all(os.path.exists(path) for path in kept)
+    assert not any(os.path.exists(path) for path in orphans)
+    assert app.get_upload_usage() == os.path.getsize(kept[0])
+
+
+def test_recent_files_are_kept(app):
+    recent = upload(app, '999_novo.pdf')
+    age(recent, app.GC_MIN_AGE / 2)
+
+    stats = app.collect_upload_garbage()
+
+    assert stats['removed'] == 0
+    assert os.path.exists(recent)
+    assert app.get_upload_usage() == os.path.getsize(recent)
+
+
+def test_compressed_upload_matches_logical_path(app):
+    [text] = submit(app, [('notas.txt', b'linha repetida\n' * 5000)])
+    assert text.endswith(app.COMPRESSED_SUFFIX)
+    orphan = upload(app, os.path.basename(text).replace('notas', 'outro'))
+
+    stats = app.collect_upload_garbage()
+
+    assert stats['removed'] == 1
+    assert os.path.exists(text)
+    assert not os.path.exists(orphan)
+
+
+def test_cursor_resumes_across_batches(app, monkeypatch):
+    kept = submit(app, [(f'doc{i}.pdf', b'%PDF-1.4 ' + bytes([i])) for i in range(3)])
+    orphans = [upload(app, f'9999_{i}_perdido.pdf') for i in range(4)]
+    total = len(kept) + len(orphans)
+    listdir_calls = []
+    real_listdir = os.listdir
+
+    def counting_listdir(path):
+        listdir_calls.append(path)
+        return real_listdir(path)
+
+    monkeypatch.setattr(app.os, 'listdir', counting_listdir)
+    scanned, removed = 0, 0
+    while True:
+        stats = app.collect_upload_garbage(max_entries=2)
+        assert stats['scanned'] <= 2
+        scanned += stats['scanned']
+        removed += stats['removed']
+        assert app.get_config('gc_cursor') == ('' if stats['cursor'] is None else json.dumps(stats['cursor']))
+        if stats['cursor'] is None:
+            break
+
+    assert (scanned, removed) == (total, len(orphans))
+    # A pasta é listada uma vez por ciclo, não a cada lote
+    assert listdir_calls.count(app.UPLOAD_DIR) == 1
+    assert all(os.path.exists(path) for path in kept)
+    assert app.get_upload_usage() == sum(os.path.getsize(path) for path in kept)
+
+
+def test_dry_run_keeps_files_and_cursor(app):
+    orphan = upload(app, '999_perdido.pdf')
+
+    stats = app.collect_upload_garbage(dry_run=True)
+
+    assert stats['removed'] == 1
+    assert os.path.exists(orphan)
+    assert not app.get_config('gc_cursor')
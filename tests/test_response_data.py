@@ -0,0 +1,102 @@
+import json
+import sqlite3
+
+import pytest
+
+SAMPLE = {
+    'nome': 'José da Silva',
+    'email': 'jose@exemplo.com.br',
+    'mensagem': 'Gostaria de um orçamento para o projeto. ' * 20,
+    'termos': True,
+    'interesses': ['Cursos', 'Consultoria'],
+    'idade': 42,
+    'observacao': None,
+}
+
+
+def codec(raw):
+    return raw[4]
+
+
+def clear_caches(app):
+    for cache in (app._response_keys, app._response_zdicts, app._response_latest_zdict):
+        cache.clear()
+
+
+def stored_data(app, response_id):
+    conn = sqlite3.connect(app.DB_PATH)
+    raw = conn.execute("SELECT data FROM responses WHERE id=?", (response_id,)).fetchone()[0]
+    conn.close()
+    return raw
+
+
+def test_json_format_is_plain_text(app):
+    encoded = app.encode_response_data(SAMPLE, fmt='json')
+    assert encoded == json.dumps(SAMPLE)
+    assert app.decode_response_data(encoded) == SAMPLE
+
+
+@pytest.mark.parametrize('data, expected_codec', [
+    ({'nome': 'Ana', 'termos': False}, 0),
+    (SAMPLE, 1),
+])
+def test_compact_round_trip(app, data, expected_codec):
+    encoded = app.encode_response_data(data, fmt='compact')
+    assert encoded.startswith(app.RESPONSE_DATA_MAGIC)
+    assert codec(encoded) == expected_codec
+    assert app.decode_response_data(encoded) == data
+
+    # Outro processo, sem caches, lê o mesmo conteúdo
+    clear_caches(app)
+    assert app.decode_response_data(encoded) == data
+
+
+def test_compact_round_trip_with_trained_dictionary(app):
+    for i in range(20):
+        app.save_response(dict(SAMPLE, nome=f'Pessoa {i}'), [])
+    dict_id = app.train_response_dict()
+    assert dict_id
+
+    encoded = app.encode_response_data(SAMPLE, fmt='compact')
+    assert codec(encoded) == 2
+    assert int.from_bytes(encoded[5:9], 'big') == dict_id
+    assert len(encoded) < len(app.encode_response_data(SAMPLE, fmt='json'))
+
+    clear_caches(app)
+    assert app.decode_response_data(encoded) == SAMPLE
+
+
+def test_mixed_formats_and_migration(app, monkeypatch):
+    json_id = app.save_response({'nome': 'Antigo'}, [])
+    monkeypatch.setattr(app, 'RESPONSE_DATA_FORMAT', 'compact')
+    compact_id = app.save_response(SAMPLE, [])
+    assert isinstance(stored_data(app, json_id), str)
+    assert isinstance(stored_data(app, compact_id), bytes)
+    assert app.get_response(json_id)['data'] == {'nome': 'Antigo'}
+    assert app.get_response(compact_id)['data'] == SAMPLE
+    assert [r['id'] for r in app.get_responses(search='josé')] == [compact_id]
+
+    stats = app.migrate_response_data(fmt='compact')
+    assert stats['changed'] == 1
+    assert isinstance(stored_data(app, json_id), bytes)
+
+    app.migrate_response_data(fmt='json')
+    assert all(isinstance(stored_data(app, i), str) for i in (json_id, compact_id))
+    assert app.get_response(compact_id)['data'] == SAMPLE
+
+
+def test_deleted_field_stays_readable(app, monkeypatch):
+    monkeypatch.setattr(app, 'RESPONSE_DATA_FORMAT', 'compact')
+    app.add_field('cidade', 'Cidade', 'text', False)
+    response_id = app.save_response({'nome': 'Ana', 'cidade': 'Recife'}, [])
+    field_id = next(f['id'] for f in app.get_fields() if f['name'] == 'cidade')
+    app.delete_field(field_id)
+
+    clear_caches(app)
+    assert app.get_response(response_id)['data'] == {'nome': 'Ana', 'cidade': 'Recife'}
+
+
+def test_unknown_version_is_rejected(app):
+    encoded = app.encode_response_data({'nome': 'Ana'}, fmt='compact')
+    with pytest.raises(ValueError):
+        app.decode_response_data(encoded[:3] + bytes([99]) + encoded[4:])
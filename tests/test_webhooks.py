@@ -0,0 +1,212 @@
+import hashlib
+import hmac
+import json
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+
+class Receiver:
+    """Servidor HTTP local que registra as entregas e responde com os status programados"""
+
+    def __init__(self, gate=None):
+        self.requests = []
+        self.statuses = []
+        receiver = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers['Content-Length']))
+                if gate is not None:
+                    gate.wait(10)
+                receiver.requests.append((dict(self.headers), body))
+                status = receiver.statuses.pop(0) if receiver.statuses else 200
+                self.send_response(status)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/hook"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def delivered_ids(self):
+        return [r['id'] for _, body in self.requests for r in json.loads(body)['responses']]
+
+
+@pytest.fixture
+def receiver():
+    server = Receiver()
+    yield server
+    server.server.shutdown()
+    server.server.server_close()
+
+
+@pytest.fixture
+def executor():
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        yield pool
+
+
+def outbox(app):
+    conn = sqlite3.connect(app.DB_PATH)
+    rows = conn.execute("SELECT response_id, status, attempts, next_attempt_at, claimed_by FROM webhook_outbox").fetchall()
+    conn.close()
+    return rows
+
+
+def submit(app, count=1):
+    ids = []
+    for i in range(count):
+        response_id = app.save_response({'nome': f'Pessoa {i}', 'email': f'p{i}@exemplo.com'}, [])
+        app.enqueue_webhooks(response_id)
+        ids.append(response_id)
+    return ids
+
+
+def test_delivery_is_signed_and_filtered(app, receiver, executor):
+    secret = app.add_webhook(app.DEFAULT_FORM_ID, receiver.url, secret='segredo', fields=['nome'])
+    [response_id] = submit(app)
+
+    assert app.dispatch_webhooks_once(executor) == 1
+
+    [(headers, body)] = receiver.requests
+    expected = hmac.new(secret.encode(), headers['X-Ribeiro-Timestamp'].encode() + b'.' + body,
+                        hashlib.sha256).hexdigest()
+    assert headers['X-Ribeiro-Signature'] == f"sha256={expected}"
+    payload = json.loads(body)
+    assert payload['event'] == 'responses.created'
+    assert payload['responses'][0]['id'] == response_id
+    assert payload['responses'][0]['data'] == {'nome': 'Pessoa 0'}
+    assert outbox(app) == []
+
+
+def test_failure_backs_off_and_is_retried(app, receiver, executor):
+    app.add_webhook(app.DEFAULT_FORM_ID, receiver.url)
+    receiver.statuses = [500]
+    [response_id] = submit(app)
+
+    before = time.time()
+    assert app.dispatch_webhooks_once(executor) == 1
+    [(_, status, attempts, next_attempt_at, claimed_by)] = outbox(app)
+    assert (status, attempts, claimed_by) == ('pending', 1, None)
+    assert next_attempt_at >= before + 2
+
+    # Ainda dentro do backoff: nada a reivindicar
+    assert app.dispatch_webhooks_once(executor) == 0
+
+    conn = sqlite3.connect(app.DB_PATH)
+    conn.execute("UPDATE webhook_outbox SET next_attempt_at=0")
+    conn.commit()
+    conn.close()
+    assert app.dispatch_webhooks_once(executor) == 1
+    assert receiver.delivered_ids() == [response_id, response_id]
+    assert outbox(app) == []
+
+
+def test_exhausted_attempts_fail_until_requeued(app, receiver, executor, monkeypatch):
+    monkeypatch.setattr(app, 'WEBHOOK_MAX_ATTEMPTS', 1)
+    app.add_webhook(app.DEFAULT_FORM_ID, receiver.url)
+    webhook_id = app.get_webhooks(app.DEFAULT_FORM_ID)[0]['id']
+    receiver.statuses = [500]
+    submit(app)
+
+    app.dispatch_webhooks_once(executor)
+    assert [row[1] for row in outbox(app)] == ['failed']
+    assert app.get_webhooks(app.DEFAULT_FORM_ID)[0]['failed'] == 1
+
+    app.retry_failed_webhooks(webhook_id, app.DEFAULT_FORM_ID)
+    assert app.dispatch_webhooks_once(executor) == 1
+    assert outbox(app) == []
+
+
+def test_backlog_is_sent_in_batches(app, receiver, executor):
+    app.add_webhook(app.DEFAULT_FORM_ID, receiver.url)
+    ids = submit(app, 2 * app.WEBHOOK_BATCH_SIZE + 20)
+
+    assert app.dispatch_webhooks_once(executor) == len(ids)
+    assert len(receiver.requests) == 3
+    assert sorted(receiver.delivered_ids()) == ids
+
+
+def test_claimed_rows_wait_for_the_lease(app, receiver, executor):
+    app.add_webhook(app.DEFAULT_FORM_ID, receiver.url)
+    [response_id] = submit(app)
+
+    # Outro processo reivindicou a entrega e ainda está dentro do lease
+    conn = sqlite3.connect(app.DB_PATH)
+    conn.execute("UPDATE webhook_outbox SET claimed_by='outro', next_attempt_at=?",
+                 (time.time() + app.WEBHOOK_LEASE,))
+    conn.commit()
+    assert app.dispatch_webhooks_once(executor) == 0
+    assert receiver.requests == []
+
+    # O processo morreu: vencido o lease, a entrega é retomada
+    conn.execute("UPDATE webhook_outbox SET next_attempt_at=?", (time.time() - 1,))
+    conn.commit()
+    conn.close()
+    assert app.dispatch_webhooks_once(executor) == 1
+    assert receiver.delivered_ids() == [response_id]
+
+
+def test_stale_claim_does_not_overwrite_the_new_owner(app, receiver):
+    app.add_webhook(app.DEFAULT_FORM_ID, receiver.url)
+    webhook = {**app.get_webhooks(app.DEFAULT_FORM_ID)[0], 'form_id': app.DEFAULT_FORM_ID}
+    [response_id] = submit(app)
+    conn = sqlite3.connect(app.DB_PATH)
+    [(outbox_id,)] = conn.execute("SELECT id FROM webhook_outbox").fetchall()
+    # O lease venceu e outro processo reivindicou a entrega
+    conn.execute("UPDATE webhook_outbox SET claimed_by='outro', next_attempt_at=?", (time.time() + 60,))
+    conn.commit()
+    conn.close()
+    lease = outbox(app)
+
+    receiver.statuses = [500]
+    app._deliver_webhook_batch(app.DB_PATH, webhook, [(outbox_id, response_id, 0)], 'antigo')
+    assert outbox(app) == lease
+
+    app._deliver_webhook_batch(app.DB_PATH, webhook, [(outbox_id, response_id, 0)], 'antigo')
+    assert outbox(app) == lease
+    assert len(receiver.requests) == 2
+
+
+def test_slow_endpoint_does_not_hold_the_others(app, receiver, executor):
+    gate = threading.Event()
+    slow = Receiver(gate)
+    try:
+        app.add_webhook(app.DEFAULT_FORM_ID, slow.url)
+        app.add_webhook(app.DEFAULT_FORM_ID, receiver.url)
+        [first] = submit(app)
+        in_flight = {}
+
+        assert app.dispatch_webhooks_once(executor, in_flight) == 2
+        [fast_future] = [f for (_, wid), f in in_flight.items() if wid == 2]
+        fast_future.result(timeout=5)
+        assert receiver.delivered_ids() == [first]
+
+        # O lote lento continua em andamento; o outro webhook segue recebendo
+        [second] = submit(app)
+        assert app.dispatch_webhooks_once(executor, in_flight) == 1
+        in_flight[(app.DB_PATH, 2)].result(timeout=5)
+        assert receiver.delivered_ids() == [first, second]
+        assert slow.requests == []
+
+        gate.set()
+        in_flight[(app.DB_PATH, 1)].result(timeout=5)
+        assert app.dispatch_webhooks_once(executor, in_flight) == 1
+        in_flight[(app.DB_PATH, 1)].result(timeout=5)
+        assert slow.delivered_ids() == [first, second]
+        assert outbox(app) == []
+    finally:
+        gate.set()
+        slow.server.shutdown()
+        slow.server.server_close()